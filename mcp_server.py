@@ -13,11 +13,27 @@ QS 世界大学排名 MCP 服务器
 import os
 import logging
 import json
-from typing import List, Dict, Any, Optional
+import asyncio
+import functools
+import threading
+from contextlib import asynccontextmanager
+from typing import List, Dict, Any, Optional, Tuple
 from fastmcp import FastMCP
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
+from qs_common import read_cache, read_qs_csv, smallest_positions, value_counts, write_cache
+
+# orjson 为可选依赖：安装后用于紧凑 JSON 序列化，直接在 C 层生成 UTF-8 字节
+try:
+    import orjson
+    # 允许非字符串键，并直接序列化 numpy 标量/数组，避免因此回退到标准库
+    ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+except ImportError:
+    orjson = None
+    ORJSON_OPTIONS = 0
+
 # 设置日志
 logging.basicConfig(
     level=logging.INFO,
@@ -29,16 +45,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+
+@asynccontextmanager
+async def _lifespan(server):
+    """服务器生命周期：启动时在后台线程预加载数据，与端口监听等初始化并行进行"""
+    async def _preload():
+        try:
+            await asyncio.to_thread(_load_data)
+        except Exception as e:
+            logger.warning(f"预加载数据失败: {e}，将在首次请求时加载")
+
+    task = asyncio.create_task(_preload())
+    try:
+        yield
+    finally:
+        if not task.done():
+            task.cancel()
+
+
+def _run_in_thread(func):
+    """将同步的工具实现包装为协程，在线程池中执行，避免 pandas 计算阻塞事件循环中的其它请求"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await asyncio.to_thread(func, *args, **kwargs)
+    return wrapper
+
+
 # 创建 FastMCP 服务器实例
-mcp = FastMCP("qs-university-rankings")
+mcp = FastMCP("qs-university-rankings", lifespan=_lifespan)
 
 # 全局数据存储
 _df = None
 _csv_path = None
+_df_by_year = None  # {年份: 该年全部记录}
+_by_year_sorted = None  # {年份: 该年有排名的记录（按排名排序）}
+_available_years = None  # 可用年份（降序）
+_display_to_iso = None  # {年份: {国家标准名称: 该年数据中的 ISO 代码}}
+_score_cols_cache = None  # 数据中实际存在的分数列
+_overall_score_col = None  # 数据中实际存在的总分列名
+_rank_changes_by_year = None  # {年份: 与前一年均有排名的大学及排名变化}
+_top100_by_year = None  # {年份: 该年 Top 100 记录}
+_country_counts_by_year = None  # {年份: (各国大学总数, 各国有排名的大学数)}
+_iso_map = None  # {原始国家名称: ISO 代码}
+_display_map = None  # {原始国家名称: 标准显示名称}
+_country_output_map = None  # {原始国家名称: 统一的国家信息结构}（只读，各响应共享）
+_load_lock = threading.Lock()  # 防止后台预加载与首次请求重复加载
 
 # 数据文件名
 DATA_FILE = "qs_cleaned.csv"
 
+# 二进制缓存文件后缀（与 CSV 同目录，避免每次冷启动重新解析 CSV）
+CACHE_SUFFIX = ".pkl"
+
 # ========== 国家代码映射 (ISO 3166-1 alpha-2) ==========
 # 标准化为 ISO 代码，便于统一识别
 # 注意：所有数据中的国家名称变体都需要映射到对应的 ISO 代码
@@ -326,11 +385,98 @@ ISO_TO_DISPLAY = {
     "PR": "Puerto Rico",
 }
 
+# 分数指标列: (候选列名, 输出键名, 显示标签)
+SCORE_COLUMNS = [
+    (["Overall_Score", "Overall"], "overall_score", "Overall Score"),
+    (["Academic Reputation"], "academic_reputation", "Academic Reputation"),
+    (["Employer Reputation"], "employer_reputation", "Employer Reputation"),
+    (["Faculty Student"], "faculty_student_ratio", "Faculty Student Ratio"),
+    (["Citations per Faculty"], "citations_per_faculty", "Citations per Faculty"),
+    (["International Faculty"], "international_faculty", "International Faculty"),
+    (["International Students"], "international_students", "International Students"),
+    (["International Research Network"], "international_research", "International Research Network"),
+    (["Employment Outcomes"], "employment_outcomes", "Employment Outcomes"),
+    (["Sustainability"], "sustainability", "Sustainability"),
+]
+
+# 需要从 CSV 读取的列（基础列 + 所有候选分数列），其余列不加载
+BASE_COLUMNS = ["Year", "Rank", "University", "Country"]
+NEEDED_COLS = BASE_COLUMNS + [c for candidates, _, _ in SCORE_COLUMNS for c in candidates]
+
+# 显式指定列类型，跳过 pandas 的逐列类型推断
+# 分数列保持 float64，保证均值/标准差等统计结果与原先一致
+CSV_DTYPES = {
+    "Year": "int32",
+    "Rank": "float32",
+    "University": "string",
+    "Country": "category",
+    **{c: "float64" for candidates, _, _ in SCORE_COLUMNS for c in candidates},
+}
+
+# 小写名称/ISO 代码到 ISO 代码的统一查找表，查询时只需做一次 lower()
+# ISO 代码优先于同名的名称别名（如 "UK" 保持为 "UK"）
+COUNTRY_TO_ISO_LOWER = {name.lower(): iso for name, iso in COUNTRY_TO_ISO.items()}
+COUNTRY_TO_ISO_LOWER.update({code.lower(): code for code in ISO_TO_DISPLAY})
+
+# 常用别名到 ISO 代码（小写输入）
+COUNTRY_ALIASES = {
+    "china": "CN",
+    "cn": "CN",
+    "usa": "US",
+    "us": "US",
+    "america": "US",
+    "uk": "GB",
+    "gb": "GB",
+    "england": "GB",
+    "britain": "GB",
+    "hk": "HK",
+    "hongkong": "HK",
+    "hong kong": "HK",
+    "singapore": "SG",
+    "sg": "SG",
+    "japan": "JP",
+    "jp": "JP",
+    "korea": "KR",
+    "kr": "KR",
+    "germany": "DE",
+    "de": "DE",
+    "france": "FR",
+    "fr": "FR",
+    "australia": "AU",
+    "au": "AU",
+    "canada": "CA",
+    "ca": "CA",
+    "switzerland": "CH",
+    "ch": "CH",
+    "swiss": "CH",
+}
+
+def _json_indent_from_env() -> Optional[int]:
+    """读取 QS_JSON_INDENT；未设置、为 0 或无法解析为整数时使用紧凑输出（仅影响调试时的可读性，不应阻止服务启动）"""
+    value = os.environ.get("QS_JSON_INDENT", "").strip()
+    if not value:
+        return None
+    try:
+        return int(value) or None
+    except ValueError:
+        logger.warning(f"QS_JSON_INDENT={value!r} 不是整数，使用紧凑 JSON 输出")
+        return None
+
+
+# JSON 输出缩进：默认紧凑输出，设置 QS_JSON_INDENT（如 2）可输出便于阅读的缩进格式
+JSON_INDENT = _json_indent_from_env()
+
 # 参数限制常量
 MAX_TOP_N = 500
 MIN_TOP_N = 1
 DEFAULT_TOP_N = 20
 
+# Top 100 分布统计的排名上限
+TOP100_RANK = 100
+
+# 工具结果缓存容量：结果只依赖参数和已加载数据，数据重新加载时清空
+RESPONSE_CACHE_SIZE = 128
+
 
 def _get_csv_path():
     """获取 CSV 文件路径"""
@@ -356,20 +502,112 @@ def _get_csv_path():
     raise FileNotFoundError(f"未找到 {DATA_FILE} 文件，请设置 QS_CSV_PATH 环境变量")
 
 
+def _get_cache_path(csv_path: str) -> str:
+    """获取 CSV 对应的 pickle 缓存路径"""
+    return os.path.splitext(csv_path)[0] + CACHE_SUFFIX
+
+
+def _add_country_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """预计算标准化的国家 ISO 代码和显示名称列（按唯一值映射，避免每次请求逐行 apply）"""
+    global _iso_map, _display_map, _country_output_map
+    countries = df["Country"].dropna().unique()
+    _iso_map = {c: _get_country_iso(c) for c in countries}
+    _display_map = {c: _get_country_display(c) for c in countries}
+    _country_output_map = {c: _normalize_country_output(c) for c in countries}
+    df["Country_ISO"] = df["Country"].map(_iso_map).astype("category")
+    df["Country_Display"] = df["Country"].map(_display_map).astype("category")
+    return df
+
+
+def _build_year_rank_index(df_by_year: Dict[int, pd.DataFrame]) -> Dict[int, pd.DataFrame]:
+    """基于按年份切分的数据，预先筛选有排名的记录并按排名排序（排名并列时保持原始顺序）"""
+    return {
+        y: g[g["Rank"].notna()].sort_values("Rank", kind="stable")
+        for y, g in df_by_year.items()
+    }
+
+
+def _build_rank_changes(df_by_year: Dict[int, pd.DataFrame]) -> Dict[int, pd.DataFrame]:
+    """预先连接每年与前一年都有排名的大学，计算排名变化（正数表示上升）"""
+    rank_changes = {}
+    for year, df_year in df_by_year.items():
+        df_prev = df_by_year.get(year - 1)
+        if df_prev is None:
+            continue
+        df_curr = df_year[["University", "Country", "Rank"]].rename(columns={"Rank": "Rank_Curr"})
+        df_prev = df_prev[["University", "Rank"]].rename(columns={"Rank": "Rank_Prev"})
+        merged = df_curr.merge(df_prev, on="University", how="inner")
+        merged = merged[merged["Rank_Curr"].notna() & merged["Rank_Prev"].notna()]
+        # 两年排名均非空，可直接转为 int64 数组；用 assign 生成新列，不在筛选结果上原地赋值
+        merged = merged.assign(Change=(merged["Rank_Prev"] - merged["Rank_Curr"]).to_numpy("int64"))
+        rank_changes[year] = merged
+    return rank_changes
+
+
+def _build_display_to_iso(df: pd.DataFrame) -> Dict[str, Optional[str]]:
+    """国家标准名称到 ISO 代码的映射（同一名称取首次出现记录的 ISO 代码）"""
+    first = df.drop_duplicates("Country_Display")
+    return {
+        display: (iso if pd.notna(iso) else None)
+        for display, iso in zip(first["Country_Display"], first["Country_ISO"])
+        if pd.notna(display)
+    }
+
+
 def _load_data():
-    """加载 CSV 数据"""
-    global _df
+    """加载数据（优先使用 pickle 缓存，缓存不可用时解析 CSV 并写入缓存）"""
     if _df is not None:
         return _df
-    
+    # 后台预加载与首次请求可能同时进入，加锁保证只加载一次
+    with _load_lock:
+        if _df is None:
+            _load_data_locked()
+    return _df
+
+
+def _load_data_locked():
+    """实际执行加载，调用方需持有 _load_lock；_df 最后赋值，其它线程不会看到半成品"""
+    global _df, _df_by_year, _by_year_sorted, _available_years, _score_cols_cache, _display_to_iso
+    global _rank_changes_by_year, _top100_by_year, _overall_score_col, _country_counts_by_year
     csv_path = _get_csv_path()
-    _df = pd.read_csv(csv_path)
+    cache_path = _get_cache_path(csv_path)
+    df = read_cache(cache_path, csv_path)
+    if df is not None:
+        logger.info(f"从缓存加载数据: {cache_path}")
+    else:
+        df = read_qs_csv(csv_path, NEEDED_COLS, CSV_DTYPES)
+        # 排名均为整数，转为可空整数类型，缺失值为 <NA>，输出时无需逐行判断是否为整数
+        df["Rank"] = pd.to_numeric(df["Rank"], errors="coerce").astype("Int64")
+        write_cache(df, cache_path, csv_path)
+    df = _add_country_columns(df)
+    # 预计算小写校名，供搜索时直接做子串匹配
+    df["University_lower"] = df["University"].str.lower().astype("string")
+    # 按年份切分一次，各工具直接取对应年份的数据，无需每次请求按年份全表筛选
+    _df_by_year = {int(y): g for y, g in df.groupby("Year", sort=False)}
+    _by_year_sorted = _build_year_rank_index(_df_by_year)
+    _rank_changes_by_year = _build_rank_changes(_df_by_year)
+    _country_counts_by_year = {
+        y: (value_counts(g["Country_Display"]), value_counts(_by_year_sorted[y]["Country_Display"]))
+        for y, g in _df_by_year.items()
+    }
+    _top100_by_year = {y: g[g["Rank"].notna() & (g["Rank"] <= TOP100_RANK)] for y, g in _df_by_year.items()}
+    _display_to_iso = {y: _build_display_to_iso(g) for y, g in _df_by_year.items()}
+    _available_years = sorted(df["Year"].dropna().unique().astype(int).tolist(), reverse=True)
+    _score_cols_cache = _resolve_score_columns(df.columns)
+    _overall_score_col = "Overall_Score" if "Overall_Score" in df.columns else "Overall"
+    _df = df
+    # 数据已重新加载，清空依赖旧数据的搜索缓存和工具结果缓存
+    _search_rows.cache_clear()
+    _country_score_stats.cache_clear()
+    _country_scores_payload.cache_clear()
+    _top100_distribution_payload.cache_clear()
+    _available_years_payload.cache_clear()
+    _countries_payload.cache_clear()
     
     logger.info(f"数据加载成功！共 {len(_df)} 条记录，"
                 f"涵盖 {_df['Year'].nunique()} 个年份，"
                 f"{_df['University'].nunique()} 所高校，"
                 f"{_df['Country'].nunique()} 个国家/地区")
-    return _df
 
 
 def _to_json(data: Any, status: str = "success", message: str = None) -> str:
@@ -381,43 +619,58 @@ def _to_json(data: Any, status: str = "success", message: str = None) -> str:
     if message:
         result["message"] = message
     result["data"] = data
-    return json.dumps(result, ensure_ascii=False, indent=2)
+    if JSON_INDENT:
+        return json.dumps(result, ensure_ascii=False, indent=JSON_INDENT)
+    if orjson is not None:
+        # MCP 文本内容要求 str，仅在返回边界解码一次；遇到 orjson 不支持的类型时回退到标准库
+        try:
+            return orjson.dumps(result, option=ORJSON_OPTIONS).decode("utf-8")
+        except TypeError:
+            pass
+    return json.dumps(result, ensure_ascii=False, separators=(",", ":"))
 
 
-def _error_response(error_type: str, message: str, details: Dict = None) -> str:
-    """生成标准化错误响应"""
+def _error_payload(error_type: str, message: str, details: Dict = None) -> Tuple[Dict, str, None]:
+    """生成标准化错误响应的 (data, status, message)，供可缓存的结果计算函数返回"""
     error_data = {
         "error_type": error_type,
         "message": message,
     }
     if details:
         error_data["details"] = details
-    return _to_json(error_data, status="error")
+    return error_data, "error", None
+
+
+def _error_response(error_type: str, message: str, details: Dict = None) -> str:
+    """生成标准化错误响应"""
+    return _to_json(*_error_payload(error_type, message, details))
 
 
 def _get_country_iso(country: str) -> str:
     """获取国家的 ISO 代码"""
     if pd.isna(country):
         return None
-    country = str(country).strip()
-    # 先检查是否已经是 ISO 代码
-    if country.upper() in ISO_TO_DISPLAY:
-        return country.upper()
-    # 从映射中查找
-    return COUNTRY_TO_ISO.get(country, None)
+    return _country_iso_cached(str(country).strip())
+
+
+@functools.lru_cache(maxsize=512)
+def _country_iso_cached(country: str) -> Optional[str]:
+    """_get_country_iso 的缓存实现（国家名称取值有限，重复查询直接命中缓存）"""
+    return COUNTRY_TO_ISO_LOWER.get(country.lower())
 
 
 def _get_country_display(country: str) -> str:
     """获取国家的标准显示名称"""
     if pd.isna(country):
         return None
-    country = str(country).strip()
-    # 如果是 ISO 代码，转换为显示名称
-    if country.upper() in ISO_TO_DISPLAY:
-        return ISO_TO_DISPLAY[country.upper()]
-    # 否则尝试从映射中获取 ISO 再转回显示名称
-    iso = COUNTRY_TO_ISO.get(country, None)
-    if iso and iso in ISO_TO_DISPLAY:
+    return _country_display_cached(str(country).strip())
+
+
+@functools.lru_cache(maxsize=512)
+def _country_display_cached(country: str) -> str:
+    """_get_country_display 的缓存实现"""
+    iso = COUNTRY_TO_ISO_LOWER.get(country.lower())
+    if iso in ISO_TO_DISPLAY:
         return ISO_TO_DISPLAY[iso]
     return country  # 保持原样
 
@@ -435,79 +688,53 @@ def _normalize_country_output(country: str) -> Dict[str, str]:
     }
 
 
+def _country_output(country: str) -> Dict[str, str]:
+    """从加载时预先构建的映射中取国家信息结构，未命中时（如缺失值）现场生成"""
+    info = _country_output_map.get(country) if isinstance(country, str) else None
+    return info if info is not None else _normalize_country_output(country)
+
+
+def _resolve_country_display(country: str) -> Optional[str]:
+    """将用户输入（ISO 代码、常用别名或国家名称）解析为标准显示名称，无法识别时返回 None"""
+    key = country.strip().lower()
+    iso = COUNTRY_ALIASES.get(key) or COUNTRY_TO_ISO_LOWER.get(key)
+    return ISO_TO_DISPLAY.get(iso) if iso else None
+
+
+def _names_containing(series: pd.Series, keyword: str) -> List[str]:
+    """返回列中包含关键词（不区分大小写）的取值，只在唯一值上计算"""
+    names = pd.Series(series.dropna().unique(), dtype="string")
+    return names[names.str.lower().str.contains(keyword, regex=False)].tolist()
+
+
 def _filter_by_country(df: pd.DataFrame, country: str) -> pd.DataFrame:
-    """按国家/地区筛选（支持 ISO 代码或全名，不区分大小写）"""
-    c = country.lower().strip()
-    c_upper = country.upper().strip()
-    
-    # 如果是 ISO 代码
-    if c_upper in ISO_TO_DISPLAY:
-        display_name = ISO_TO_DISPLAY[c_upper]
-        # 匹配所有可能的原始名称
-        possible_names = [k for k, v in COUNTRY_TO_ISO.items() if v == c_upper]
-        possible_names.append(display_name)
-        
-        def match_iso(val):
-            if pd.isna(val):
-                return False
-            val_str = str(val).strip()
-            return val_str in possible_names or val_str.lower() in [n.lower() for n in possible_names]
-        
-        mask = df["Country"].apply(match_iso)
-        return df[mask].copy()
-    
-    # 常用别名映射
-    aliases = {
-        "china": ["cn", "china (mainland)", "china(mainland)"],
-        "cn": ["cn", "china (mainland)", "china(mainland)"],
-        "usa": ["us", "united states"],
-        "us": ["us", "united states"],
-        "america": ["us", "united states"],
-        "uk": ["gb", "united kingdom"],
-        "gb": ["gb", "united kingdom"],
-        "england": ["gb", "united kingdom"],
-        "britain": ["gb", "united kingdom"],
-        "hk": ["hk", "hong kong"],
-        "hongkong": ["hk", "hong kong"],
-        "hong kong": ["hk", "hong kong"],
-        "singapore": ["sg", "singapore"],
-        "sg": ["sg", "singapore"],
-        "japan": ["jp", "japan"],
-        "jp": ["jp", "japan"],
-        "korea": ["kr", "korea", "south korea"],
-        "kr": ["kr", "korea", "south korea"],
-        "germany": ["de", "germany"],
-        "de": ["de", "germany"],
-        "france": ["fr", "france"],
-        "fr": ["fr", "france"],
-        "australia": ["au", "australia"],
-        "au": ["au", "australia"],
-        "canada": ["ca", "canada"],
-        "ca": ["ca", "canada"],
-        "switzerland": ["ch", "switzerland", "swiss"],
-        "ch": ["ch", "switzerland", "swiss"],
-    }
-    
-    search_terms = aliases.get(c, [c])
-    
-    def match_country(val):
-        if pd.isna(val):
-            return False
-        val_lower = str(val).lower().strip()
-        for term in search_terms:
-            if val_lower == term or term in val_lower:
-                if term in ["us", "united states"]:
-                    if "australia" in val_lower:
-                        continue
-                return True
-        return False
-    
-    mask = df["Country"].apply(match_country)
-    return df[mask].copy()
+    """按国家/地区筛选（支持 ISO 代码、常用别名或名称，不区分大小写）"""
+    display_name = _resolve_country_display(country)
+    if display_name is not None:
+        # 可识别的国家：直接比较预计算的标准名称分类列
+        mask = df["Country_Display"] == display_name
+    else:
+        # 无法识别的输入：按原始名称或标准名称的子串匹配
+        kw = country.lower().strip()
+        mask = (
+            df["Country"].isin(_names_containing(df["Country"], kw))
+            | df["Country_Display"].isin(_names_containing(df["Country_Display"], kw))
+        )
+    return df[mask]
+
+
+@functools.lru_cache(maxsize=256)
+def _search_rows(kw: str, year: Optional[int]) -> Tuple[int, ...]:
+    """返回校名（小写）包含关键词的记录行标签，按 (关键词, 年份) 缓存"""
+    df = _df if year is None else _df_by_year[year]
+    mask = df["University_lower"].str.contains(kw, na=False, regex=False)
+    return tuple(df.index[mask])
 
 
 def _get_available_years(df: pd.DataFrame) -> List[int]:
-    """获取可用年份列表"""
+    """获取可用年份列表（数据加载后只计算一次）"""
+    if _available_years is not None and df is _df:
+        return _available_years
     return sorted(df["Year"].dropna().unique().astype(int).tolist(), reverse=True)
 
 
@@ -532,24 +759,18 @@ def _validate_top_n(top_n: int, max_val: int = MAX_TOP_N) -> Optional[str]:
 
 
 def _get_score_columns(df: pd.DataFrame) -> List[tuple]:
-    """获取可用的分数列"""
-    indicator_cols = [
-        (["Overall_Score", "Overall"], "overall_score", "Overall Score"),
-        (["Academic Reputation"], "academic_reputation", "Academic Reputation"),
-        (["Employer Reputation"], "employer_reputation", "Employer Reputation"),
-        (["Faculty Student"], "faculty_student_ratio", "Faculty Student Ratio"),
-        (["Citations per Faculty"], "citations_per_faculty", "Citations per Faculty"),
-        (["International Faculty"], "international_faculty", "International Faculty"),
-        (["International Students"], "international_students", "International Students"),
-        (["International Research Network"], "international_research", "International Research Network"),
-        (["Employment Outcomes"], "employment_outcomes", "Employment Outcomes"),
-        (["Sustainability"], "sustainability", "Sustainability"),
-    ]
-    
+    """获取可用的分数列（所有查询结果与加载的数据列相同，直接返回加载时的解析结果）"""
+    if _score_cols_cache is not None:
+        return _score_cols_cache
+    return _resolve_score_columns(df.columns)
+
+
+def _resolve_score_columns(columns) -> List[tuple]:
+    """根据数据列解析每个分数指标实际使用的列名"""
     resolved_cols = []
-    for candidates, key, label in indicator_cols:
+    for candidates, key, label in SCORE_COLUMNS:
         for c in candidates:
-            if c in df.columns:
+            if c in columns:
                 resolved_cols.append((c, key, label))
                 break
     
@@ -578,7 +799,8 @@ def _get_completeness_note(years_with_rank: int, years_with_score: int, total_ye
 # ========== MCP 工具定义 ==========
 
 @mcp.tool()
-async def search_university(
+@_run_in_thread
+def search_university(
     keyword: str,
     year: Optional[int] = None
 ) -> str:
@@ -631,12 +853,10 @@ async def search_university(
                     year_error,
                     {"available_years": available_years}
                 )
-            df = df[df["Year"] == year].copy()
         
-        # 模糊搜索
+        # 模糊搜索（相同关键词和年份的匹配结果会被缓存）
         kw = keyword.lower()
-        mask = df["University"].str.lower().str.contains(kw, na=False)
-        result_df = df[mask].copy()
+        result_df = df.loc[list(_search_rows(kw, year))]
         
         if len(result_df) == 0:
             return _error_response(
@@ -651,6 +871,7 @@ async def search_university(
         
         # 获取分数列
         score_cols = _get_score_columns(result_df)
+        score_col_names = [col for col, _, _ in score_cols]
         
         universities = result_df["University"].unique().tolist()
         
@@ -683,8 +904,8 @@ async def search_university(
         
         for uni in universities:
             uni_df = result_df[result_df["University"] == uni].sort_values("Year")
-            country_raw = uni_df["Country"].iloc[0] if "Country" in uni_df.columns else None
-            country_info = _normalize_country_output(country_raw)
+            country_raw = uni_df["Country"].to_numpy()[0] if "Country" in uni_df.columns else None
+            country_info = _country_output(country_raw)
             
             # 判断匹配类型
             uni_lower = uni.lower()
@@ -710,27 +931,24 @@ async def search_university(
             years_with_rank = 0
             years_with_score = 0
             
-            for _, row in uni_df.iterrows():
-                rank_val = row["Rank"]
-                has_rank = pd.notna(rank_val)
-                rank = int(rank_val) if has_rank and float(rank_val) == int(rank_val) else None
+            # 一次性取出需要的列为字典列表，避免 iterrows 逐行构造 Series
+            records = uni_df[["Year", "Rank"] + score_col_names].to_dict("records")
+            for rec in records:
+                has_rank = bool(pd.notna(rec["Rank"]))
+                rank = int(rec["Rank"]) if has_rank else None
                 
                 year_info = {
-                    "year": int(row["Year"]) if pd.notna(row["Year"]) else None,
+                    "year": int(rec["Year"]) if pd.notna(rec["Year"]) else None,
                     "rank": rank,
                     "has_rank": has_rank,
-                    "scores": {}
+                    "scores": {
+                        key: {"value": round(float(rec[col]), 1), "label": label}
+                        for col, key, label in score_cols
+                        if pd.notna(rec[col])
+                    }
                 }
                 
-                has_any_score = False
-                for col, key, label in score_cols:
-                    if col in row and pd.notna(row[col]):
-                        year_info["scores"][key] = {
-                            "value": round(float(row[col]), 1),
-                            "label": label
-                        }
-                        has_any_score = True
-                
+                has_any_score = bool(year_info["scores"])
                 year_info["has_scores"] = has_any_score
                 
                 # 统计数据完整性
@@ -776,7 +994,8 @@ async def search_university(
 
 
 @mcp.tool()
-async def get_top_universities(
+@_run_in_thread
+def get_top_universities(
     year: int,
     country: Optional[str] = None,
     top_n: int = 10
@@ -816,14 +1035,14 @@ async def get_top_universities(
         
         logger.info(f"开始排名查询: year={year}, country={country}, top_n={top_n}")
         
-        # 年份筛选
-        df = df[df["Year"] == year].copy()
+        # 该年份已按排名排序的记录（加载时预计算）
+        df_ranked = _by_year_sorted[year]
         
-        # 国家筛选
+        # 国家筛选（在已排序的数据上筛选，无需重新排序）
         country_info = None
         if country:
-            df_filtered = _filter_by_country(df, country)
-            if len(df_filtered) == 0:
+            df_filtered = _filter_by_country(df_ranked, country)
+            if len(df_filtered) == 0 and len(_filter_by_country(_df_by_year[year], country)) == 0:
                 return _error_response(
                     "NOT_FOUND",
                     f"未找到国家/地区 '{country}' 的数据",
@@ -832,15 +1051,14 @@ async def get_top_universities(
                         "examples": ["CN", "US", "GB", "JP", "DE", "FR", "AU"]
                     }
                 )
-            df = df_filtered
+            df_ranked = df_filtered
             # 获取标准化的国家信息
-            sample_country = df["Country"].iloc[0]
-            country_info = _normalize_country_output(sample_country)
+            if len(df_ranked) > 0:
+                sample_country = df_ranked["Country"].to_numpy()[0]
+                country_info = _normalize_country_output(sample_country)
         
-        # 获取有排名的并排序
-        df_valid = df[df["Rank"].notna()].copy()
-        total_ranked = len(df_valid)
-        df_valid = df_valid.sort_values("Rank").head(top_n)
+        total_ranked = len(df_ranked)
+        df_valid = df_ranked.head(top_n)
         
         if len(df_valid) == 0:
             return _error_response(
@@ -870,27 +1088,21 @@ async def get_top_universities(
             "universities": []
         }
         
-        for _, row in df_valid.iterrows():
-            rank_val = row["Rank"]
-            rank = int(rank_val) if pd.notna(rank_val) and float(rank_val) == int(rank_val) else None
+        # 一次性取出需要的列为字典列表，避免 iterrows 逐行构造 Series
+        output_cols = ["Rank", "University", "Country"] + [col for col, _, _ in score_cols]
+        for rec in df_valid[output_cols].to_dict("records"):
+            rank = int(rec["Rank"])
             
-            uni_country = _normalize_country_output(row["Country"])
-            
-            uni_info = {
+            data["universities"].append({
                 "rank": rank,
-                "name": row["University"],
-                "country": uni_country,
-                "scores": {}
-            }
-            
-            for col, key, label in score_cols:
-                if col in row and pd.notna(row[col]):
-                    uni_info["scores"][key] = {
-                        "value": round(float(row[col]), 1),
-                        "label": label
-                    }
-            
-            data["universities"].append(uni_info)
+                "name": rec["University"],
+                "country": _country_output(rec["Country"]),
+                "scores": {
+                    key: {"value": round(float(rec[col]), 1), "label": label}
+                    for col, key, label in score_cols
+                    if pd.notna(rec[col])
+                }
+            })
         
         logger.info(f"排名查询完成: {year}年前{top_n}名")
         return _to_json(data, "success", f"返回 {len(df_valid)} 所大学的排名信息")
@@ -901,7 +1113,8 @@ async def get_top_universities(
 
 
 @mcp.tool()
-async def get_country_stats(
+@_run_in_thread
+def get_country_stats(
     year: int,
     top_n: int = 20
 ) -> str:
@@ -939,21 +1152,15 @@ async def get_country_stats(
         
         logger.info(f"开始国家统计: year={year}, top_n={top_n}")
         
-        df_year = df[df["Year"] == year].copy()
-        
-        # 标准化国家信息
-        df_year["Country_Display"] = df_year["Country"].apply(_get_country_display)
-        df_year["Country_ISO"] = df_year["Country"].apply(_get_country_iso)
+        df_year = _df_by_year[year]
         
-        # 统计各国大学数量
-        country_counts = df_year["Country_Display"].value_counts()
+        display_to_iso = _display_to_iso[year]
         
-        # 统计有排名的大学数量
-        df_ranked = df_year[df_year["Rank"].notna()]
-        ranked_counts = df_ranked["Country_Display"].value_counts()
+        # 各国大学总数和有排名的大学数已在加载时统计
+        country_counts, ranked_counts = _country_counts_by_year[year]
         
         total_all = len(df_year)
-        total_ranked = len(df_ranked)
+        total_ranked = len(_by_year_sorted[year])
         total_countries = len(country_counts)
         
         data = {
@@ -976,8 +1183,7 @@ async def get_country_stats(
             pct = round(count / total_all * 100, 2)
             
             # 获取该国家的 ISO 代码
-            country_df = df_year[df_year["Country_Display"] == country_display]
-            iso_code = country_df["Country_ISO"].iloc[0] if len(country_df) > 0 else None
+            iso_code = display_to_iso.get(country_display)
             
             data["countries"].append({
                 "rank": i,
@@ -1004,8 +1210,102 @@ async def get_country_stats(
         return _error_response("INTERNAL_ERROR", f"国家统计失败: {str(e)}")
 
 
+@functools.lru_cache(maxsize=None)
+def _country_score_stats(year: int) -> Optional[pd.DataFrame]:
+    """计算某年各国家/地区的分数统计（有排名且有分数的记录），没有有效分数时返回 None"""
+    df_year = _df_by_year[year]
+    score_col = _overall_score_col
+    df_scored = df_year[df_year["Rank"].notna() & df_year[score_col].notna()]
+    if len(df_scored) == 0:
+        return None
+    
+    # 一次分组同时计算均值、最值、数量、标准差、最好排名和 ISO 代码
+    # observed=True：只统计实际出现的国家（pandas 2.x 对分类列默认会输出全部类别）；
+    # 保持按国家名排序分组，使平均分并列时 nlargest 的先后顺序不变
+    stats = df_scored.groupby("Country_Display", observed=True).agg({
+        score_col: ["mean", "max", "min", "count", "std"],
+        "Rank": "min",
+        "Country_ISO": "first"
+    }).round(2)
+    
+    stats.columns = ["avg_score", "max_score", "min_score", "university_count", "std_dev", "best_rank", "iso_code"]
+    return stats
+
+
+@functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _country_scores_payload(year: int, top_n: int) -> Tuple[Dict, str, Optional[str]]:
+    """计算国家平均分对比结果（按参数缓存，返回 _to_json 所需的 (data, status, message)）"""
+    available_years = _available_years
+    
+    df_year = _df_by_year[year]
+    df_year = df_year[df_year["Rank"].notna()]
+    
+    # 分数列已在加载时确定
+    score_col = _overall_score_col
+    
+    if score_col not in df_year.columns:
+        return _error_payload(
+            "DATA_ERROR",
+            "数据中没有找到分数列",
+            {"available_columns": list(df_year.columns)}
+        )
+    
+    # 各国分数统计与 top_n 无关，按年份只计算一次
+    stats = _country_score_stats(year)
+    
+    if stats is None:
+        return _error_payload(
+            "NO_DATA",
+            f"{year} 年没有有效的分数数据"
+        )
+    
+    total_countries = len(stats)
+    # 只需前 top_n 个国家，用 nlargest 做部分选择，避免对全部国家排序
+    top_stats = stats.nlargest(top_n, "avg_score")
+    
+    data = {
+        "query": {
+            "year": year,
+            "top_n": top_n,
+            "available_years": available_years
+        },
+        "summary": {
+            "total_countries_with_scores": total_countries,
+            "score_column_used": score_col,
+            "description": f"{year}年共有{total_countries}个国家/地区有分数数据"
+        },
+        "countries": []
+    }
+    
+    # 一次性取出为字典列表，避免 iterrows 逐行构造 Series
+    for i, (country, row) in enumerate(zip(top_stats.index, top_stats.to_dict("records")), 1):
+        data["countries"].append({
+            "rank": i,
+            "country": {
+                "iso_code": row["iso_code"],
+                "name": country
+            },
+            "scores": {
+                "average": float(row["avg_score"]),
+                "maximum": float(row["max_score"]),
+                "minimum": float(row["min_score"]),
+                "std_deviation": float(row["std_dev"]) if pd.notna(row["std_dev"]) else None
+            },
+            "statistics": {
+                "university_count": int(row["university_count"]),
+                "best_rank": int(row["best_rank"]) if pd.notna(row["best_rank"]) else None
+            }
+        })
+    
+    if total_countries > top_n:
+        data["note"] = f"共 {total_countries} 个国家/地区有分数数据，仅显示前 {top_n} 个"
+    
+    return data, "success", f"返回 {min(top_n, total_countries)} 个国家/地区的分数统计"
+
+
 @mcp.tool()
-async def get_country_scores(
+@_run_in_thread
+def get_country_scores(
     year: int,
     top_n: int = 15
 ) -> str:
@@ -1043,80 +1343,10 @@ async def get_country_scores(
         
         logger.info(f"开始国家平均分对比: year={year}, top_n={top_n}")
         
-        df_year = df[df["Year"] == year].copy()
-        df_year = df_year[df_year["Rank"].notna()]
-        df_year["Country_Display"] = df_year["Country"].apply(_get_country_display)
-        df_year["Country_ISO"] = df_year["Country"].apply(_get_country_iso)
-        
-        # 确定分数列
-        score_col = "Overall_Score" if "Overall_Score" in df_year.columns else "Overall"
-        
-        if score_col not in df_year.columns:
-            return _error_response(
-                "DATA_ERROR",
-                "数据中没有找到分数列",
-                {"available_columns": list(df_year.columns)}
-            )
-        
-        # 过滤掉没有分数的记录
-        df_scored = df_year[df_year[score_col].notna()]
-        
-        if len(df_scored) == 0:
-            return _error_response(
-                "NO_DATA",
-                f"{year} 年没有有效的分数数据"
-            )
-        
-        # 计算各国平均分数
-        stats = df_scored.groupby("Country_Display").agg({
-            score_col: ["mean", "max", "min", "count", "std"],
-            "Rank": "min",
-            "Country_ISO": "first"
-        }).round(2)
-        
-        stats.columns = ["avg_score", "max_score", "min_score", "university_count", "std_dev", "best_rank", "iso_code"]
-        stats = stats.sort_values("avg_score", ascending=False)
-        
-        total_countries = len(stats)
-        
-        data = {
-            "query": {
-                "year": year,
-                "top_n": top_n,
-                "available_years": available_years
-            },
-            "summary": {
-                "total_countries_with_scores": total_countries,
-                "score_column_used": score_col,
-                "description": f"{year}年共有{total_countries}个国家/地区有分数数据"
-            },
-            "countries": []
-        }
-        
-        for i, (country, row) in enumerate(stats.head(top_n).iterrows(), 1):
-            data["countries"].append({
-                "rank": i,
-                "country": {
-                    "iso_code": row["iso_code"],
-                    "name": country
-                },
-                "scores": {
-                    "average": float(row["avg_score"]),
-                    "maximum": float(row["max_score"]),
-                    "minimum": float(row["min_score"]),
-                    "std_deviation": float(row["std_dev"]) if pd.notna(row["std_dev"]) else None
-                },
-                "statistics": {
-                    "university_count": int(row["university_count"]),
-                    "best_rank": int(row["best_rank"]) if pd.notna(row["best_rank"]) else None
-                }
-            })
-        
-        if total_countries > top_n:
-            data["note"] = f"共 {total_countries} 个国家/地区有分数数据，仅显示前 {top_n} 个"
-        
-        logger.info(f"国家平均分对比完成: {year}年前{top_n}个国家")
-        return _to_json(data, "success", f"返回 {min(top_n, total_countries)} 个国家/地区的分数统计")
+        data, status, message = _country_scores_payload(year, top_n)
+        if status == "success":
+            logger.info(f"国家平均分对比完成: {year}年前{top_n}个国家")
+        return _to_json(data, status, message)
         
     except Exception as e:
         logger.error(f"国家平均分对比失败: {str(e)}")
@@ -1124,7 +1354,8 @@ async def get_country_scores(
 
 
 @mcp.tool()
-async def get_rank_changes(
+@_run_in_thread
+def get_rank_changes(
     year: int,
     top_n: int = 20,
     direction: str = "rise"
@@ -1179,14 +1410,8 @@ async def get_rank_changes(
         
         logger.info(f"开始排名变化查询: year={year}, top_n={top_n}, direction={direction}")
         
-        df_curr = df[df["Year"] == year][["University", "Country", "Rank"]].copy()
-        df_prev = df[df["Year"] == prev_year][["University", "Rank"]].copy()
-        
-        df_curr = df_curr.rename(columns={"Rank": "Rank_Curr"})
-        df_prev = df_prev.rename(columns={"Rank": "Rank_Prev"})
-        
-        merged = df_curr.merge(df_prev, on="University", how="inner")
-        merged = merged[merged["Rank_Curr"].notna() & merged["Rank_Prev"].notna()]
+        # 与前一年的排名对比表已在加载时预先连接好
+        merged = _rank_changes_by_year[year]
         
         if len(merged) == 0:
             return _error_response(
@@ -1194,15 +1419,16 @@ async def get_rank_changes(
                 f"没有找到 {prev_year} 和 {year} 年都有排名的大学"
             )
         
-        # 计算变化（正数表示上升）
-        merged["Change"] = merged["Rank_Prev"] - merged["Rank_Curr"]
-        
+        # 上升取变化最大的前 N 个，下降取变化最小的前 N 个（取反后统一按最小值选取）
+        change = merged["Change"].to_numpy()
         if direction == "rise":
-            result = merged[merged["Change"] > 0].nlargest(top_n, "Change")
+            keys = -change
             direction_cn = "上升"
         else:
-            result = merged[merged["Change"] < 0].nsmallest(top_n, "Change")
+            keys = change
             direction_cn = "下降"
+        positions = np.flatnonzero(keys < 0)
+        result = merged.iloc[positions[smallest_positions(keys[positions], top_n)]]
         
         if len(result) == 0:
             return _error_response(
@@ -1227,9 +1453,11 @@ async def get_rank_changes(
             "universities": []
         }
         
-        for i, (_, row) in enumerate(result.iterrows(), 1):
+        # 一次性取出需要的列为字典列表，避免 iterrows 逐行构造 Series
+        output_cols = ["University", "Country", "Rank_Prev", "Rank_Curr", "Change"]
+        for i, row in enumerate(result[output_cols].to_dict("records"), 1):
             change = int(row["Change"])
-            country_info = _normalize_country_output(row["Country"])
+            country_info = _country_output(row["Country"])
             
             data["universities"].append({
                 "rank_order": i,
@@ -1253,8 +1481,63 @@ async def get_rank_changes(
         return _error_response("INTERNAL_ERROR", f"排名变化查询失败: {str(e)}")
 
 
+@functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _top100_distribution_payload(year: int) -> Tuple[Dict, str, Optional[str]]:
+    """计算 Top 100 国家分布结果（按年份缓存，返回 _to_json 所需的 (data, status, message)）"""
+    available_years = _available_years
+    
+    df_year = _top100_by_year[year]
+    
+    if len(df_year) == 0:
+        return _error_payload(
+            "NO_DATA",
+            f"{year} 年没有 Top 100 排名数据",
+            {"available_years": available_years}
+        )
+    
+    # Country_Display / Country_ISO 已在加载时预计算；一次分组同时得到数量、最好排名和 ISO 代码
+    # 按数量降序，数量相同时保持首次出现的顺序（与 _value_counts 一致）
+    country_stats = df_year.groupby("Country_Display", observed=True, sort=False).agg(
+        university_count=("Rank", "size"),
+        best_rank=("Rank", "min"),
+        iso_code=("Country_ISO", "first"),
+    ).sort_values("university_count", ascending=False, kind="stable")
+    total_countries = len(country_stats)
+    
+    data = {
+        "query": {
+            "year": year,
+            "scope": "Top 100",
+            "available_years": available_years
+        },
+        "summary": {
+            "total_universities": len(df_year),
+            "total_countries": total_countries,
+            "description": f"{year}年 Top 100 大学来自 {total_countries} 个国家/地区"
+        },
+        "distribution": []
+    }
+    
+    for row in country_stats.itertuples():
+        pct = round(row.university_count / len(df_year) * 100, 1)
+        data["distribution"].append({
+            "country": {
+                "iso_code": row.iso_code,
+                "name": row.Index
+            },
+            "statistics": {
+                "count": int(row.university_count),
+                "percentage": pct,
+                "best_rank": int(row.best_rank)
+            }
+        })
+    
+    return data, "success", f"Top 100 大学分布在 {total_countries} 个国家/地区"
+
+
 @mcp.tool()
-async def get_top100_distribution(
+@_run_in_thread
+def get_top100_distribution(
     year: int
 ) -> str:
     """
@@ -1281,55 +1564,10 @@ async def get_top100_distribution(
         
         logger.info(f"开始 Top 100 分布查询: year={year}")
         
-        df_year = df[(df["Year"] == year) & (df["Rank"].notna()) & (df["Rank"] <= 100)].copy()
-        
-        if len(df_year) == 0:
-            return _error_response(
-                "NO_DATA",
-                f"{year} 年没有 Top 100 排名数据",
-                {"available_years": available_years}
-            )
-        
-        df_year["Country_Display"] = df_year["Country"].apply(_get_country_display)
-        df_year["Country_ISO"] = df_year["Country"].apply(_get_country_iso)
-        
-        country_counts = df_year["Country_Display"].value_counts()
-        total_countries = len(country_counts)
-        
-        data = {
-            "query": {
-                "year": year,
-                "scope": "Top 100",
-                "available_years": available_years
-            },
-            "summary": {
-                "total_universities": len(df_year),
-                "total_countries": total_countries,
-                "description": f"{year}年 Top 100 大学来自 {total_countries} 个国家/地区"
-            },
-            "distribution": []
-        }
-        
-        for country_display, count in country_counts.items():
-            country_df = df_year[df_year["Country_Display"] == country_display]
-            iso_code = country_df["Country_ISO"].iloc[0] if len(country_df) > 0 else None
-            best_rank = int(country_df["Rank"].min())
-            
-            pct = round(count / len(df_year) * 100, 1)
-            data["distribution"].append({
-                "country": {
-                    "iso_code": iso_code,
-                    "name": country_display
-                },
-                "statistics": {
-                    "count": int(count),
-                    "percentage": pct,
-                    "best_rank": best_rank
-                }
-            })
-        
-        logger.info(f"Top 100 分布查询完成: {year}年涉及{total_countries}个国家/地区")
-        return _to_json(data, "success", f"Top 100 大学分布在 {total_countries} 个国家/地区")
+        data, status, message = _top100_distribution_payload(year)
+        if status == "success":
+            logger.info(f"Top 100 分布查询完成: {year}年涉及{data['summary']['total_countries']}个国家/地区")
+        return _to_json(data, status, message)
         
     except Exception as e:
         logger.error(f"Top 100 分布查询失败: {str(e)}")
@@ -1455,8 +1693,47 @@ async def get_top100_distribution(
 #         return _error_response("INTERNAL_ERROR", f"综合统计失败: {str(e)}")
 
 
+@functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _available_years_payload() -> Tuple[Dict, str, Optional[str]]:
+    """计算可用年份及每年统计（数据加载后只计算一次，返回 _to_json 所需的 (data, status, message)）"""
+    available_years = _available_years
+    
+    # 每年的统计信息
+    year_stats = []
+    for year in available_years:
+        df_year = _df_by_year[year]
+        total = len(df_year)
+        ranked = int(df_year["Rank"].notna().sum())
+        countries = int(df_year["Country"].nunique())
+        
+        year_stats.append({
+            "year": year,
+            "total_universities": total,
+            "ranked_universities": ranked,
+            "unranked_universities": total - ranked,
+            "countries_count": countries,
+            "ranking_coverage": f"{round(ranked/total*100, 1)}%" if total > 0 else "0%"
+        })
+    
+    # 添加数据说明
+    latest = available_years[0] if available_years else None
+    
+    data = {
+        "available_years": available_years,
+        "count": len(available_years),
+        "latest_year": latest,
+        "earliest_year": available_years[-1] if available_years else None,
+        "recommended_year": latest,
+        "year_statistics": year_stats,
+        "note": "不同年份的排名覆盖率可能不同，建议使用最新年份获取最完整数据"
+    }
+    
+    return data, "success", f"共有 {len(available_years)} 个可用年份，推荐使用 {latest} 年数据"
+
+
 @mcp.tool()
-async def list_available_years() -> str:
+@_run_in_thread
+def list_available_years() -> str:
     """
     功能7: 查看可用年份
     列出数据中所有可用的年份及其数据统计
@@ -1475,49 +1752,77 @@ async def list_available_years() -> str:
     try:
         logger.info("查询可用年份")
         
-        df = _load_data()
-        available_years = _get_available_years(df)
-        
-        # 每年的统计信息
-        year_stats = []
-        for year in available_years:
-            df_year = df[df["Year"] == year]
-            total = len(df_year)
-            ranked = int(df_year["Rank"].notna().sum())
-            countries = int(df_year["Country"].nunique())
-            
-            year_stats.append({
-                "year": year,
-                "total_universities": total,
-                "ranked_universities": ranked,
-                "unranked_universities": total - ranked,
-                "countries_count": countries,
-                "ranking_coverage": f"{round(ranked/total*100, 1)}%" if total > 0 else "0%"
-            })
-        
-        # 添加数据说明
-        latest = available_years[0] if available_years else None
-        
-        data = {
-            "available_years": available_years,
-            "count": len(available_years),
-            "latest_year": latest,
-            "earliest_year": available_years[-1] if available_years else None,
-            "recommended_year": latest,
-            "year_statistics": year_stats,
-            "note": "不同年份的排名覆盖率可能不同，建议使用最新年份获取最完整数据"
-        }
+        _load_data()
         
-        logger.info(f"可用年份查询完成: {available_years}")
-        return _to_json(data, "success", f"共有 {len(available_years)} 个可用年份，推荐使用 {latest} 年数据")
+        data, status, message = _available_years_payload()
+        logger.info(f"可用年份查询完成: {data['available_years']}")
+        return _to_json(data, status, message)
         
     except Exception as e:
         logger.error(f"查询可用年份失败: {str(e)}")
         return _error_response("INTERNAL_ERROR", f"查询可用年份失败: {str(e)}")
 
 
+@functools.lru_cache(maxsize=RESPONSE_CACHE_SIZE)
+def _countries_payload(year: Optional[int]) -> Tuple[Dict, str, Optional[str]]:
+    """计算国家/地区列表（按年份缓存，返回 _to_json 所需的 (data, status, message)）"""
+    available_years = _available_years
+    df = _df if year is None else _df_by_year[year]
+    
+    # 获取唯一国家并标准化（使用标准化名称去重）
+    countries_raw = df["Country"].dropna().unique()
+    
+    # 使用字典按标准化名称去重
+    countries_map = {}  # key: 标准化名称, value: {iso_code, name, original_variants}
+    
+    for c in countries_raw:
+        iso = _iso_map[c]
+        display = _display_map[c]
+        name = display if display else c
+        
+        if name in countries_map:
+            # 已存在，记录原始变体名称
+            if c != name and c not in countries_map[name]["original_variants"]:
+                countries_map[name]["original_variants"].append(c)
+        else:
+            # 新增
+            countries_map[name] = {
+                "iso_code": iso,
+                "name": name,
+                "original_variants": [c] if c != name else []
+            }
+    
+    # 转换为列表并排序
+    countries_list = []
+    for name in sorted(countries_map.keys()):
+        item = countries_map[name]
+        entry = {
+            "iso_code": item["iso_code"],
+            "name": item["name"]
+        }
+        # 只有当存在原始变体时才添加该字段
+        if item["original_variants"]:
+            entry["original_variants"] = item["original_variants"]
+        countries_list.append(entry)
+    
+    data = {
+        "query": {
+            "year_filter": year,
+            "available_years": available_years
+        },
+        "summary": {
+            "count": len(countries_list),
+            "description": f"{'所有年份' if year is None else f'{year}年'}共有 {len(countries_list)} 个国家/地区"
+        },
+        "countries": countries_list
+    }
+    
+    return data, "success", f"共 {len(countries_list)} 个国家/地区"
+
+
 @mcp.tool()
-async def list_countries(
+@_run_in_thread
+def list_countries(
     year: Optional[int] = None
 ) -> str:
     """
@@ -1544,58 +1849,10 @@ async def list_countries(
                     year_error,
                     {"available_years": available_years}
                 )
-            df = df[df["Year"] == year]
-        
-        # 获取唯一国家并标准化（使用标准化名称去重）
-        countries_raw = df["Country"].dropna().unique()
-        
-        # 使用字典按标准化名称去重
-        countries_map = {}  # key: 标准化名称, value: {iso_code, name, original_variants}
-        
-        for c in countries_raw:
-            iso = _get_country_iso(c)
-            display = _get_country_display(c)
-            name = display if display else c
-            
-            if name in countries_map:
-                # 已存在，记录原始变体名称
-                if c != name and c not in countries_map[name]["original_variants"]:
-                    countries_map[name]["original_variants"].append(c)
-            else:
-                # 新增
-                countries_map[name] = {
-                    "iso_code": iso,
-                    "name": name,
-                    "original_variants": [c] if c != name else []
-                }
         
-        # 转换为列表并排序
-        countries_list = []
-        for name in sorted(countries_map.keys()):
-            item = countries_map[name]
-            entry = {
-                "iso_code": item["iso_code"],
-                "name": item["name"]
-            }
-            # 只有当存在原始变体时才添加该字段
-            if item["original_variants"]:
-                entry["original_variants"] = item["original_variants"]
-            countries_list.append(entry)
-        
-        data = {
-            "query": {
-                "year_filter": year,
-                "available_years": available_years
-            },
-            "summary": {
-                "count": len(countries_list),
-                "description": f"{'所有年份' if year is None else f'{year}年'}共有 {len(countries_list)} 个国家/地区"
-            },
-            "countries": countries_list
-        }
-        
-        logger.info(f"国家列表查询完成: 共{len(countries_list)}个国家/地区")
-        return _to_json(data, "success", f"共 {len(countries_list)} 个国家/地区")
+        data, status, message = _countries_payload(year)
+        logger.info(f"国家列表查询完成: 共{data['summary']['count']}个国家/地区")
+        return _to_json(data, status, message)
         
     except Exception as e:
         logger.error(f"查询国家列表失败: {str(e)}")
@@ -1621,11 +1878,7 @@ def main():
     logger.info("🎓 QS 世界大学排名 MCP 服务器启动")
     logger.info("=" * 60)
     
-    # 预加载数据
-    try:
-        _load_data()
-    except Exception as e:
-        logger.warning(f"预加载数据失败: {e}，将在首次请求时加载")
+    # 数据由 _lifespan 在服务器启动时于后台线程预加载
     
     # 获取端口配置
     port = int(os.environ.get("MCP_PORT", os.environ.get("PORT", "9000")))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+QS 排名数据的公共工具
+
+mcp_server.py 与控制台脚本（qs_stats.py、qs_top.py）共用，保证各处解析 CSV、缓存、
+取前 N 名和计数的方式一致。
+"""
+
+import logging
+import os
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+# pyarrow 为可选依赖：安装后使用其多线程 CSV 解析器，否则回退到 pandas 默认的 C 解析器
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# pickle 缓存格式版本：缓存内容 (版本号, 源文件 st_mtime_ns, DataFrame)；缓存格式或预处理逻辑变化时递增
+CACHE_VERSION = 4
+
+logger = logging.getLogger(__name__)
+
+
+def read_qs_csv(path: str, needed_cols: List[str], dtypes: Dict[str, str]) -> pd.DataFrame:
+    """解析 CSV，只读取 needed_cols 中实际存在的列；pyarrow 可用时优先使用多线程解析，失败则回退到 C 解析器"""
+    if CSV_ENGINE == "pyarrow":
+        try:
+            # pyarrow 引擎不支持可调用的 usecols，先读表头确定实际存在的列
+            header = pd.read_csv(path, nrows=0).columns
+            usecols = [c for c in header if c in needed_cols]
+            return pd.read_csv(
+                path,
+                engine="pyarrow",
+                usecols=usecols,
+                dtype={c: dtypes[c] for c in usecols if c in dtypes},
+            )
+        except Exception as e:
+            logger.warning(f"pyarrow 解析 CSV 失败: {e}，回退到 C 解析器")
+    return pd.read_csv(path, usecols=lambda c: c in needed_cols, dtype=dtypes)
+
+
+def read_cache(cache_path: str, source_path: str) -> Optional[pd.DataFrame]:
+    """读取 pickle 缓存；缓存不存在、版本不符或源文件修改时间（纳秒）与写入时不一致时返回 None"""
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        cached = pd.read_pickle(cache_path)
+    except Exception as e:
+        logger.warning(f"读取数据缓存 {cache_path} 失败: {e}，将重新解析 CSV")
+        return None
+    if not (isinstance(cached, tuple) and len(cached) == 3 and cached[0] == CACHE_VERSION):
+        logger.info(f"数据缓存 {cache_path} 版本不符，将重新解析 CSV")
+        return None
+    _, source_mtime_ns, df = cached
+    if source_mtime_ns != os.stat(source_path).st_mtime_ns:
+        logger.info(f"数据缓存 {cache_path} 已过期，将重新解析 CSV")
+        return None
+    return df
+
+
+def write_cache(df: pd.DataFrame, cache_path: str, source_path: str):
+    """写入 pickle 缓存，并记录源文件的修改时间（只读文件系统等情况下失败不影响使用）"""
+    try:
+        pd.to_pickle((CACHE_VERSION, os.stat(source_path).st_mtime_ns, df), cache_path)
+        logger.info(f"已写入数据缓存: {cache_path}")
+    except Exception as e:
+        logger.warning(f"写入数据缓存 {cache_path} 失败: {e}")
+
+
+def smallest_positions(keys: np.ndarray, n: int) -> np.ndarray:
+    """返回 keys 中最小的 n 个值的位置，按值升序、并列时按原始顺序（与 nsmallest(keep="first") 一致）
+
+    先用 np.partition 找出第 n 小的阈值，只对不超过阈值的候选做稳定排序，避免全量排序。
+    """
+    if 0 < n < len(keys):
+        kth = np.partition(keys, n - 1)[n - 1]
+        candidates = np.flatnonzero(keys <= kth)
+    else:
+        candidates = np.arange(len(keys))
+    order = np.argsort(keys[candidates], kind="stable")
+    return candidates[order][:max(n, 0)]
+
+
+def top_n_by(df: pd.DataFrame, col: str, n: int, ascending: bool = True) -> pd.DataFrame:
+    """按某列取前 n 行（忽略缺失值），并列时保持原始顺序"""
+    values = df[col].to_numpy(dtype="float64", na_value=np.nan)
+    positions = np.flatnonzero(~np.isnan(values))
+    keys = values[positions] if ascending else -values[positions]
+    return df.iloc[positions[smallest_positions(keys, n)]]
+
+
+def value_counts(series: pd.Series) -> pd.Series:
+    """按取值计数并按数量降序排列，数量相同时保持首次出现的顺序
+
+    分类列的 value_counts 会包含未出现的类别且并列时按类别顺序排列，这里只统计实际出现的取值。
+    """
+    counts = series.groupby(series, observed=True, sort=False).size()
+    return counts.sort_values(ascending=False, kind="stable")
+
+
+def print_lines(lines: List[str]):
+    """一次性写出多行，代替循环中逐行 print"""
+    sys.stdout.write("".join(f"{line}\n" for line in lines))
@@ -19,19 +19,25 @@ import pandas as pd
 
 DATA_FILE = "qs_cleaned.csv"
 
+# 国家取值有限，按分类类型读取可节省内存；年份范围很小，int16 足够
+CSV_DTYPES = {"Year": "int16", "Country": "category"}
+
 
 def load_data() -> pd.DataFrame:
     if not Path(DATA_FILE).exists():
         print(f"错误: 找不到数据文件 {DATA_FILE}")
         print("请先运行 scripts/clean_data.py 生成清洗后的数据。")
         sys.exit(1)
-    return pd.read_csv(DATA_FILE)
+    df = pd.read_csv(DATA_FILE, dtype=CSV_DTYPES)
+    # 预先计算小写校名，搜索时无需重复转换
+    df["_UniLower"] = df["University"].str.lower()
+    return df
 
 
 def search_university(df: pd.DataFrame, keyword: str) -> pd.DataFrame:
     """根据关键词模糊搜索大学名称（不区分大小写）"""
     kw = keyword.lower()
-    mask = df["University"].str.lower().str.contains(kw, na=False)
+    mask = df["_UniLower"].str.contains(kw, na=False, regex=False)
     return df[mask].copy()
 
 
@@ -40,9 +46,9 @@ def display_results(df: pd.DataFrame, keyword: str):
         print(f"\n未找到包含 \"{keyword}\" 的大学。")
         return
 
-    # Group by university and show each year
-    universities = df["University"].unique()
-    print(f"\n找到 {len(universities)} 所大学，共 {len(df)} 条年度记录：\n")
+    # Group by university and show each year (single pass, keeps first-seen order)
+    grouped = df.groupby("University", sort=False)
+    print(f"\n找到 {grouped.ngroups} 所大学，共 {len(df)} 条年度记录：\n")
 
     # Determine columns to show (try both possible column names)
     indicator_cols = [
@@ -66,8 +72,8 @@ def display_results(df: pd.DataFrame, keyword: str):
                 resolved_cols.append((c, label))
                 break
 
-    for uni in universities:
-        uni_df = df[df["University"] == uni].sort_values("Year")
+    for uni, uni_df in grouped:
+        uni_df = uni_df.sort_values("Year")
         country = uni_df["Country"].iloc[0] if "Country" in uni_df.columns else "N/A"
         print("=" * 80)
         print(f"🎓 {uni}")
@@ -79,14 +85,16 @@ def display_results(df: pd.DataFrame, keyword: str):
         print()
         print("-" * 80)
 
-        for _, row in uni_df.iterrows():
-            year = int(row["Year"]) if pd.notna(row["Year"]) else "?"
-            rank = row["Rank"] if pd.notna(row["Rank"]) else "-"
+        # 按列一次性取出为列表，逐行只做列表索引，避免 iterrows 构造 Series
+        cols = {c: uni_df[c].tolist() for c in ["Year", "Rank"] + [col for col, _ in resolved_cols]}
+        for i in range(len(uni_df)):
+            year = int(cols["Year"][i]) if pd.notna(cols["Year"][i]) else "?"
+            rank = cols["Rank"][i] if pd.notna(cols["Rank"][i]) else "-"
             if isinstance(rank, float) and rank == int(rank):
                 rank = int(rank)
             print(f"{year:^6} {str(rank):^8}", end="")
             for col, _ in resolved_cols:
-                val = row[col]
+                val = cols[col][i]
                 if pd.notna(val):
                     print(f" {val:^8.1f}", end="")
                 else:
@@ -26,81 +26,130 @@ qs_stats.py — QS 大学排名统计汇总
 """
 
 import argparse
+import functools
 import sys
 from pathlib import Path
-from typing import Optional
+import numpy as np
 import pandas as pd
 
+from qs_common import print_lines, read_cache, read_qs_csv, top_n_by, value_counts, write_cache
+
 DATA_FILE = "qs_cleaned.csv"
+# 解析结果缓存（各脚本读取的列不同，分别使用单独的缓存文件）
+CACHE_FILE = "qs_cleaned.stats.pkl"
+
+# 统计命令只用到以下列，其余列不解析也不缓存
+SCORE_COLS = ["Overall_Score", "Overall"]
+NEEDED_COLS = ["Year", "Rank", "University", "Country"] + SCORE_COLS
+
+# 显式指定列类型：国家取值有限用分类类型，年份用 int16；排名读入后转为可空整数
+CSV_DTYPES = {"Year": "int16", "Country": "category"}
+
+# Top 100 柱状图最大宽度；柱子从预先生成的整条中切片得到
+BAR_WIDTH = 30
+FULL_BAR = "█" * BAR_WIDTH
+
+
+@functools.lru_cache(maxsize=4)
+def _load_data_cached(path: str, mtime_ns: int) -> pd.DataFrame:
+    """解析并预处理数据；以 (路径, 修改时间) 为键缓存，同一进程内重复调用直接复用
+
+    返回的 DataFrame 为共享对象，调用方只能读取或基于它生成新对象，不能原地修改。
+    """
+    df = read_cache(CACHE_FILE, path)
+    if df is None:
+        df = read_qs_csv(path, NEEDED_COLS, CSV_DTYPES)
+        df["Rank"] = df["Rank"].astype("Int32")
+        # 以排好序的年份作为索引，按年份取数据时直接切片，无需逐行比较
+        df = df.sort_values("Year", kind="stable").set_index("Year")
+        # 国家名称在加载时统一标准化一次，并随缓存保存
+        df["Country_Normalized"] = normalize_country_series(df["Country"]).astype("category")
+        write_cache(df, CACHE_FILE, path)
+    # 分数列在加载时确定一次，随 attrs 传递给按年份筛选后的结果
+    df.attrs["score_col"] = "Overall_Score" if "Overall_Score" in df.columns else "Overall"
+    # 记录数据来源，供按年份缓存的派生结果（如排名变化对比表）作为缓存键
+    df.attrs["source"] = (path, mtime_ns)
+    return df
 
 
 def load_data() -> pd.DataFrame:
+    """加载数据；解析结果按文件修改时间缓存，各命令共用同一份 DataFrame"""
     if not Path(DATA_FILE).exists():
         print(f"错误: 找不到数据文件 {DATA_FILE}")
         print("请先运行 scripts/clean_data.py 生成清洗后的数据。")
         sys.exit(1)
-    return pd.read_csv(DATA_FILE)
+    return _load_data_cached(DATA_FILE, Path(DATA_FILE).stat().st_mtime_ns)
+
+
+# 常见的国家名称映射（不同年份数据中的代码和别名 -> 统一名称）
+COUNTRY_MAP = {
+    "US": "United States",
+    "United States of America": "United States",
+    "UK": "United Kingdom",
+    "CN": "China (Mainland)",
+    "China": "China (Mainland)",
+    "HK": "Hong Kong SAR",
+    "Hong Kong SAR, China": "Hong Kong SAR",
+    "SG": "Singapore",
+    "JP": "Japan",
+    "KR": "South Korea",
+    "Republic of Korea": "South Korea",
+    "South Korea": "South Korea",
+    "DE": "Germany",
+    "FR": "France",
+    "AU": "Australia",
+    "CA": "Canada",
+    "CH": "Switzerland",
+    "NL": "Netherlands",
+    "SE": "Sweden",
+    "IT": "Italy",
+    "ES": "Spain",
+    "RU": "Russia",
+    "Russian Federation": "Russia",
+    "TW": "Taiwan",
+    "IN": "India",
+    "BR": "Brazil",
+    "MX": "Mexico",
+    "Türkiye": "Turkey",
+    "TR": "Turkey",
+    "MO": "Macau SAR",
+    "Macao SAR, China": "Macau SAR",
+}
 
 
 def normalize_country(country: str) -> str:
     """标准化国家名称（处理不同表述）"""
     country = str(country).strip()
-    
-    # 常见的国家名称映射
-    mapping = {
-        "US": "United States",
-        "United States of America": "United States",
-        "UK": "United Kingdom",
-        "CN": "China (Mainland)",
-        "China": "China (Mainland)",
-        "HK": "Hong Kong SAR",
-        "Hong Kong SAR, China": "Hong Kong SAR",
-        "SG": "Singapore",
-        "JP": "Japan",
-        "KR": "South Korea",
-        "Republic of Korea": "South Korea",
-        "South Korea": "South Korea",
-        "DE": "Germany",
-        "FR": "France",
-        "AU": "Australia",
-        "CA": "Canada",
-        "CH": "Switzerland",
-        "NL": "Netherlands",
-        "SE": "Sweden",
-        "IT": "Italy",
-        "ES": "Spain",
-        "RU": "Russia",
-        "Russian Federation": "Russia",
-        "TW": "Taiwan",
-        "IN": "India",
-        "BR": "Brazil",
-        "MX": "Mexico",
-        "Türkiye": "Turkey",
-        "TR": "Turkey",
-        "MO": "Macau SAR",
-        "Macao SAR, China": "Macau SAR",
-    }
-    
-    return mapping.get(country, country)
+    return COUNTRY_MAP.get(country, country)
+
+
+def normalize_country_series(countries: pd.Series) -> pd.Series:
+    """批量标准化国家名称：整列一次字典映射，不在映射中的名称保持原样"""
+    stripped = countries.astype("string").str.strip()
+    return stripped.map(COUNTRY_MAP).fillna(stripped)
+
+
+def filter_by_year(df: pd.DataFrame, year: int) -> pd.DataFrame:
+    """筛选指定年份的数据（Year 为有序索引，直接切片）"""
+    return df.loc[[year]] if year in df.index else df.iloc[:0]
 
 
 def stats_country(df: pd.DataFrame, year: int, top_n: int = 20):
     """各国/地区大学数量统计"""
-    df_year = df[df["Year"] == year].copy()
+    df_year = filter_by_year(df, year)
     
     if df_year.empty:
         print(f"\n{year} 年没有数据。")
         return
     
-    # 标准化国家名称
-    df_year["Country_Normalized"] = df_year["Country"].apply(normalize_country)
-    
-    # 统计各国大学数量
-    country_counts = df_year["Country_Normalized"].value_counts()
-    
-    # 统计有排名的大学数量
-    df_ranked = df_year[df_year["Rank"].notna()]
-    ranked_counts = df_ranked["Country_Normalized"].value_counts()
+    # 一次分组同时统计各国大学总数和有排名的数量（国家名称已在加载时标准化）
+    # 计数全部交给 pandas 分组完成；这里没有数值内循环，不用 numba 之类的 JIT
+    has_rank = df_year["Rank"].notna()
+    g = has_rank.groupby(df_year["Country_Normalized"], observed=True, sort=False)
+    counts = pd.DataFrame({"total": g.size(), "ranked": g.sum()})
+    counts = counts.sort_values("total", ascending=False, kind="stable")
+    country_counts = counts["total"]
+    ranked_counts = counts["ranked"]
     
     print(f"\n📊 {year} 年 QS 世界大学排名 - 各国/地区大学数量统计\n")
     print("=" * 70)
@@ -108,12 +157,14 @@ def stats_country(df: pd.DataFrame, year: int, top_n: int = 20):
     print("-" * 70)
     
     total_all = len(df_year)
-    total_ranked = len(df_ranked)
+    total_ranked = int(has_rank.sum())
     
+    lines = []
     for i, (country, count) in enumerate(country_counts.head(top_n).items(), 1):
         ranked = ranked_counts.get(country, 0)
         pct = count / total_all * 100
-        print(f"{i:^4} {country:<25} {count:^8} {ranked:^8} {pct:^9.1f}%")
+        lines.append(f"{i:^4} {country:<25} {count:^8} {ranked:^8} {pct:^9.1f}%")
+    print_lines(lines)
     
     print("=" * 70)
     print(f"{'':^4} {'合计':<25} {total_all:^8} {total_ranked:^8} {'100.0%':^10}")
@@ -124,7 +175,7 @@ def stats_country(df: pd.DataFrame, year: int, top_n: int = 20):
 
 def stats_score(df: pd.DataFrame, year: int, top_n: int = 15):
     """各国/地区平均分数对比"""
-    df_year = df[df["Year"] == year].copy()
+    df_year = filter_by_year(df, year)
     
     if df_year.empty:
         print(f"\n{year} 年没有数据。")
@@ -132,17 +183,21 @@ def stats_score(df: pd.DataFrame, year: int, top_n: int = 15):
     
     # 只考虑有排名的大学
     df_year = df_year[df_year["Rank"].notna()]
-    df_year["Country_Normalized"] = df_year["Country"].apply(normalize_country)
     
     # 计算各国平均分数
-    score_col = "Overall_Score" if "Overall_Score" in df_year.columns else "Overall"
-    
-    stats = df_year.groupby("Country_Normalized").agg({
-        score_col: ["mean", "max", "min", "count"],
-        "Rank": "min"  # 最好排名
-    }).round(1)
-    
-    stats.columns = ["平均分", "最高分", "最低分", "大学数", "最好排名"]
+    score_col = df.attrs["score_col"]
+    
+    # 逐列单独聚合，直接得到扁平列，避免 MultiIndex 列
+    # 聚合由 pandas 的分组内核完成，手写 numba 循环并不会比它更快，因此保持纯 pandas 实现
+    g = df_year.groupby("Country_Normalized", observed=True)
+    scores = g[score_col]
+    stats = pd.DataFrame({
+        "平均分": scores.mean().round(1),  # 排序依据为显示精度
+        "最高分": scores.max(),
+        "最低分": scores.min(),
+        "大学数": scores.count(),
+        "最好排名": g["Rank"].min(),  # 最好排名
+    })
     stats = stats.sort_values("平均分", ascending=False)
     
     print(f"\n📊 {year} 年 QS 世界大学排名 - 各国/地区平均分数对比\n")
@@ -150,9 +205,13 @@ def stats_score(df: pd.DataFrame, year: int, top_n: int = 15):
     print(f"{'排序':^4} {'国家/地区':<22} {'平均分':^8} {'最高分':^8} {'最低分':^8} {'大学数':^6} {'最好排名':^8}")
     print("-" * 80)
     
-    for i, (country, row) in enumerate(stats.head(top_n).iterrows(), 1):
-        best_rank = int(row["最好排名"]) if pd.notna(row["最好排名"]) else "-"
-        print(f"{i:^4} {country:<22} {row['平均分']:^8.1f} {row['最高分']:^8.1f} {row['最低分']:^8.1f} {int(row['大学数']):^6} {str(best_rank):^8}")
+    top = stats.head(top_n).round(1)
+    rows = zip(top.index, *(top[c].to_numpy() for c in ["平均分", "最高分", "最低分", "大学数", "最好排名"]))
+    lines = []
+    for i, (country, avg, mx, mn, cnt, best) in enumerate(rows, 1):
+        best_rank = int(best) if pd.notna(best) else "-"
+        lines.append(f"{i:^4} {country:<22} {avg:^8.1f} {mx:^8.1f} {mn:^8.1f} {int(cnt):^6} {str(best_rank):^8}")
+    print_lines(lines)
     
     print("=" * 80)
     
@@ -160,40 +219,47 @@ def stats_score(df: pd.DataFrame, year: int, top_n: int = 15):
         print(f"\n（共 {len(stats)} 个国家/地区，仅显示前 {top_n} 个）")
 
 
+@functools.lru_cache(maxsize=8)
+def _build_change_table(path: str, mtime_ns: int, year: int) -> pd.DataFrame:
+    """连接当年与前一年都有排名的大学并计算排名变化；以 (数据来源, 年份) 为键在内存中缓存"""
+    df = _load_data_cached(path, mtime_ns)
+    df_curr = filter_by_year(df, year)[["University", "Country_Normalized", "Rank"]]
+    df_prev = filter_by_year(df, year - 1)[["University", "Rank"]]
+    
+    # 合并数据
+    df_curr = df_curr.rename(columns={"Rank": "Rank_Curr"})
+    df_prev = df_prev.rename(columns={"Rank": "Rank_Prev"})
+    
+    merged = df_curr.merge(df_prev, on="University", how="inner")
+    merged = merged[merged["Rank_Curr"].notna() & merged["Rank_Prev"].notna()]
+    
+    # 计算变化（正数表示上升，负数表示下降）
+    return merged.assign(Change=merged["Rank_Prev"] - merged["Rank_Curr"])
+
+
 def stats_change(df: pd.DataFrame, year: int, top_n: int = 20, rise: bool = True):
     """排名变化最大的大学"""
     prev_year = year - 1
     
-    df_curr = df[df["Year"] == year][["University", "Country", "Rank"]].copy()
-    df_prev = df[df["Year"] == prev_year][["University", "Rank"]].copy()
-    
-    if df_curr.empty:
+    if year not in df.index:
         print(f"\n{year} 年没有数据。")
         return
     
-    if df_prev.empty:
+    if prev_year not in df.index:
         print(f"\n{prev_year} 年没有数据，无法计算变化。")
         return
     
-    # 合并数据
-    df_curr = df_curr.rename(columns={"Rank": "Rank_Curr"})
-    df_prev = df_prev.rename(columns={"Rank": "Rank_Prev"})
-    
-    merged = df_curr.merge(df_prev, on="University", how="inner")
-    merged = merged[merged["Rank_Curr"].notna() & merged["Rank_Prev"].notna()]
-    
-    # 计算变化（正数表示上升，负数表示下降）
-    merged["Change"] = merged["Rank_Prev"] - merged["Rank_Curr"]
+    merged = _build_change_table(*df.attrs["source"], year)
     
     if rise:
         # 排名上升最多（Change 最大）
-        result = merged.nlargest(top_n, "Change")
+        result = top_n_by(merged, "Change", top_n, ascending=False)
         result = result[result["Change"] > 0]
         direction = "上升"
         emoji = "📈"
     else:
         # 排名下降最多（Change 最小）
-        result = merged.nsmallest(top_n, "Change")
+        result = top_n_by(merged, "Change", top_n)
         result = result[result["Change"] < 0]
         direction = "下降"
         emoji = "📉"
@@ -203,18 +269,21 @@ def stats_change(df: pd.DataFrame, year: int, top_n: int = 20, rise: bool = True
     print(f"{'序号':^4} {'大学名称':<40} {'国家':^12} {f'{prev_year}':^6} {f'{year}':^6} {'变化':^8}")
     print("-" * 90)
     
-    for i, (_, row) in enumerate(result.iterrows(), 1):
-        uni = row["University"]
+    # 按列取出为数组后逐行 zip，避免 iterrows 为每行构造 Series
+    change_cols = ["University", "Country_Normalized", "Rank_Prev", "Rank_Curr", "Change"]
+    rows = zip(*(result[c].to_numpy() for c in change_cols))
+    lines = []
+    for i, (uni, country, prev_rank, curr_rank, change) in enumerate(rows, 1):
         if len(uni) > 38:
             uni = uni[:36] + "..."
-        country = normalize_country(row["Country"])
         if len(country) > 10:
             country = country[:10] + ".."
-        prev_rank = int(row["Rank_Prev"])
-        curr_rank = int(row["Rank_Curr"])
-        change = int(row["Change"])
+        prev_rank = int(prev_rank)
+        curr_rank = int(curr_rank)
+        change = int(change)
         change_str = f"+{change}" if change > 0 else str(change)
-        print(f"{i:^4} {uni:<40} {country:^12} {prev_rank:^6} {curr_rank:^6} {change_str:^8}")
+        lines.append(f"{i:^4} {uni:<40} {country:^12} {prev_rank:^6} {curr_rank:^6} {change_str:^8}")
+    print_lines(lines)
     
     print("=" * 90)
     print(f"共 {len(result)} 所大学")
@@ -222,28 +291,27 @@ def stats_change(df: pd.DataFrame, year: int, top_n: int = 20, rise: bool = True
 
 def stats_top100(df: pd.DataFrame, year: int):
     """Top 100 大学国家分布"""
-    df_year = df[(df["Year"] == year) & (df["Rank"].notna()) & (df["Rank"] <= 100)].copy()
+    df_year = filter_by_year(df, year)
+    df_year = df_year[df_year["Rank"].notna() & (df_year["Rank"] <= 100)]
     
     if df_year.empty:
         print(f"\n{year} 年没有 Top 100 数据。")
         return
     
-    df_year["Country_Normalized"] = df_year["Country"].apply(normalize_country)
-    
-    country_counts = df_year["Country_Normalized"].value_counts()
+    country_counts = value_counts(df_year["Country_Normalized"])
     
     print(f"\n🏆 {year} 年 QS 世界大学排名 Top 100 国家分布\n")
     print("=" * 60)
     
     # 绘制简易柱状图
     max_count = country_counts.max()
-    bar_width = 30
     
+    lines = []
     for country, count in country_counts.items():
-        bar_len = int(count / max_count * bar_width)
-        bar = "█" * bar_len
+        bar = FULL_BAR[:int(count / max_count * BAR_WIDTH)]
         pct = count / 100 * 100
-        print(f"{country:<20} {bar:<30} {count:>2} ({pct:>5.1f}%)")
+        lines.append(f"{country:<20} {bar:<{BAR_WIDTH}} {count:>2} ({pct:>5.1f}%)")
+    print_lines(lines)
     
     print("=" * 60)
     print(f"Top 100 共涉及 {len(country_counts)} 个国家/地区")
@@ -251,21 +319,19 @@ def stats_top100(df: pd.DataFrame, year: int):
 
 def stats_summary(df: pd.DataFrame, year: int):
     """综合统计摘要"""
-    df_year = df[df["Year"] == year].copy()
+    df_year = filter_by_year(df, year)
     
     if df_year.empty:
         print(f"\n{year} 年没有数据。")
         return
     
-    df_year["Country_Normalized"] = df_year["Country"].apply(normalize_country)
-    
     # 基本统计
     total_unis = len(df_year)
     ranked_unis = df_year["Rank"].notna().sum()
     countries = df_year["Country_Normalized"].nunique()
     
     # 分数统计
-    score_col = "Overall_Score" if "Overall_Score" in df_year.columns else "Overall"
+    score_col = df.attrs["score_col"]
     df_scored = df_year[df_year[score_col].notna()]
     
     print(f"\n📋 {year} 年 QS 世界大学排名 - 综合统计摘要\n")
@@ -279,24 +345,26 @@ def stats_summary(df: pd.DataFrame, year: int):
     print(f"   覆盖国家/地区：{countries}")
     
     # Top 10 大学
-    top10 = df_year[df_year["Rank"].notna()].nsmallest(10, "Rank")
+    top10 = top_n_by(df_year, "Rank", 10)
     print("\n🥇 Top 10 大学")
     print("-" * 70)
-    for _, row in top10.iterrows():
-        rank = int(row["Rank"])
-        uni = row["University"]
+    top10_cols = ["Rank", "University", "Country_Normalized"]
+    lines = []
+    for rank, uni, country in zip(*(top10[c].to_numpy() for c in top10_cols)):
+        rank = int(rank)
         if len(uni) > 45:
             uni = uni[:43] + "..."
-        country = normalize_country(row["Country"])
-        print(f"   {rank:>2}. {uni:<45} ({country})")
+        lines.append(f"   {rank:>2}. {uni:<45} ({country})")
+    print_lines(lines)
     
     # Top 5 国家
     print("\n🌍 大学数量 Top 5 国家/地区")
     print("-" * 70)
-    country_counts = df_year["Country_Normalized"].value_counts().head(5)
-    for i, (country, count) in enumerate(country_counts.items(), 1):
-        pct = count / total_unis * 100
-        print(f"   {i}. {country:<25} {count:>4} 所 ({pct:.1f}%)")
+    country_counts = value_counts(df_year["Country_Normalized"]).head(5)
+    print_lines([
+        f"   {i}. {country:<25} {count:>4} 所 ({count / total_unis * 100:.1f}%)"
+        for i, (country, count) in enumerate(country_counts.items(), 1)
+    ])
     
     # 分数分布
     if not df_scored.empty:
@@ -315,19 +383,22 @@ def stats_summary(df: pd.DataFrame, year: int):
         # 分数段分布
         bins = [0, 30, 50, 70, 90, 100]
         labels = ["0-30", "30-50", "50-70", "70-90", "90-100"]
-        score_bins = pd.cut(df_scored[score_col], bins=bins, labels=labels, right=True)
-        bin_counts = score_bins.value_counts().sort_index()
+        # 区间为左开右闭 (a, b]，searchsorted(side="left") 恰好给出右闭区间的编号
+        idx = np.searchsorted(bins, df_scored[score_col].to_numpy(dtype="float64"), side="left")
+        in_range = (idx > 0) & (idx < len(bins))
+        bin_counts = np.bincount(idx[in_range] - 1, minlength=len(labels))
         
         print("\n   分数段分布：")
-        for label in labels:
-            count = bin_counts.get(label, 0)
+        lines = []
+        for label, count in zip(labels, bin_counts):
             bar_len = int(count / 50)  # 每50所大学一个方块
             bar = "▓" * bar_len if bar_len > 0 else "▏"
-            print(f"   {label:>8}: {bar} {count}")
+            lines.append(f"   {label:>8}: {bar} {count}")
+        print_lines(lines)
     
     # 与去年对比
     prev_year = year - 1
-    df_prev = df[df["Year"] == prev_year]
+    df_prev = filter_by_year(df, prev_year)
     if not df_prev.empty:
         prev_total = len(df_prev)
         prev_ranked = df_prev["Rank"].notna().sum()
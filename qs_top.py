@@ -21,12 +21,99 @@ qs_top.py — QS 大学排名 Top N 查询
 """
 
 import argparse
+import functools
+import re
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional, Tuple
 import pandas as pd
 
+from qs_common import print_lines, read_cache, read_qs_csv, top_n_by, write_cache
+
 DATA_FILE = "qs_cleaned.csv"
+# 解析结果缓存（各脚本读取的列不同，分别使用单独的缓存文件）
+CACHE_FILE = "qs_cleaned.top.pkl"
+
+# 查询和展示只用到以下列，其余列不解析也不缓存
+NEEDED_COLS = [
+    "Year", "Rank", "University", "Country", "Overall_Score", "Overall",
+    "Academic Reputation", "Employer Reputation", "Citations per Faculty", "Sustainability",
+]
+
+# 展示的指标列：(候选列名, 表头)，取第一个实际存在的候选列
+INDICATOR_COLS = [
+    (["Overall_Score", "Overall"], "Overall"),
+    (["Academic Reputation"], "学术声誉"),
+    (["Employer Reputation"], "雇主声誉"),
+    (["Citations per Faculty"], "论文引用"),
+    (["Sustainability"], "可持续"),
+]
+
+# 显式指定列类型：国家取值有限用分类类型，年份用 int16；排名读入后转为可空整数
+CSV_DTYPES = {"Year": "int16", "Country": "category"}
+
+# 常用别名映射 - 使用更精确的匹配词
+COUNTRY_ALIASES = {
+    "china": ["cn", "china (mainland)", "china(mainland)"],
+    "cn": ["cn", "china (mainland)", "china(mainland)"],
+    "usa": ["us", "united states"],
+    "us": ["us", "united states"],
+    "america": ["us", "united states"],
+    "uk": ["uk", "united kingdom"],
+    "england": ["uk", "united kingdom"],
+    "britain": ["uk", "united kingdom"],
+    "hk": ["hk", "hong kong"],
+    "hongkong": ["hk", "hong kong"],
+    "hong kong": ["hk", "hong kong"],
+    "singapore": ["sg", "singapore"],
+    "sg": ["sg", "singapore"],
+    "japan": ["jp", "japan"],
+    "jp": ["jp", "japan"],
+    "korea": ["kr", "korea"],
+    "kr": ["kr", "korea"],
+    "germany": ["de", "germany"],
+    "de": ["de", "germany"],
+    "france": ["fr", "france"],
+    "fr": ["fr", "france"],
+    "australia": ["au", "australia"],
+    "au": ["au", "australia"],
+    "canada": ["ca", "canada"],
+    "ca": ["ca", "canada"],
+    "switzerland": ["ch", "switzerland", "swiss"],
+    "ch": ["ch", "switzerland", "swiss"],
+}
+
+# 美国相关的搜索词，匹配时需排除包含 "australia" 的名称
+US_TERMS = ["us", "united states"]
+
+
+def _resolve_indicator_cols(columns: pd.Index) -> List[Tuple[str, str]]:
+    """按表结构解析实际展示的指标列，返回 [(列名, 表头)]"""
+    resolved_cols = []
+    for candidates, label in INDICATOR_COLS:
+        for c in candidates:
+            if c in columns:
+                resolved_cols.append((c, label))
+                break
+    return resolved_cols
+
+
+@functools.lru_cache(maxsize=4)
+def _load_data_cached(path: str, mtime_ns: int) -> pd.DataFrame:
+    """解析并预处理数据；以 (路径, 修改时间) 为键缓存，同一进程内重复调用直接复用
+
+    返回的 DataFrame 为共享对象，调用方只能读取或基于它生成新对象，不能原地修改。
+    """
+    df = read_cache(CACHE_FILE, path)
+    if df is None:
+        df = read_qs_csv(path, NEEDED_COLS, CSV_DTYPES)
+        df["Rank"] = df["Rank"].astype("Int32")
+        # 以排好序的年份作为索引，按年份取数据时直接切片，无需逐行比较
+        df = df.sort_values("Year", kind="stable").set_index("Year")
+        write_cache(df, CACHE_FILE, path)
+    # 指标列在加载时按表结构解析一次，随 attrs 传递给筛选后的结果
+    df.attrs["indicator_cols"] = _resolve_indicator_cols(df.columns)
+    return df
 
 
 def load_data() -> pd.DataFrame:
@@ -34,11 +121,16 @@ def load_data() -> pd.DataFrame:
         print(f"错误: 找不到数据文件 {DATA_FILE}")
         print("请先运行 scripts/clean_data.py 生成清洗后的数据。")
         sys.exit(1)
-    return pd.read_csv(DATA_FILE)
+    return _load_data_cached(DATA_FILE, Path(DATA_FILE).stat().st_mtime_ns)
 
 def filter_by_year(df: pd.DataFrame, year: int) -> pd.DataFrame:
-    """筛选指定年份的数据"""
-    return df[df["Year"] == year].copy()
+    """筛选指定年份的数据（Year 为有序索引，直接切片）"""
+    return df.loc[[year]] if year in df.index else df.iloc[:0]
+
+
+def _alternation(terms: List[str]) -> "re.Pattern[str]":
+    """把多个字面搜索词编译成一个正则交替式"""
+    return re.compile("|".join(re.escape(t) for t in terms))
 
 
 def filter_by_country(df: pd.DataFrame, country: str) -> pd.DataFrame:
@@ -51,63 +143,29 @@ def filter_by_country(df: pd.DataFrame, country: str) -> pd.DataFrame:
     """
     c = country.lower().strip()
     
-    # 常用别名映射 - 使用更精确的匹配词
-    aliases = {
-        "china": ["cn", "china (mainland)", "china(mainland)"],
-        "cn": ["cn", "china (mainland)", "china(mainland)"],
-        "usa": ["us", "united states"],
-        "us": ["us", "united states"],
-        "america": ["us", "united states"],
-        "uk": ["uk", "united kingdom"],
-        "england": ["uk", "united kingdom"],
-        "britain": ["uk", "united kingdom"],
-        "hk": ["hk", "hong kong"],
-        "hongkong": ["hk", "hong kong"],
-        "hong kong": ["hk", "hong kong"],
-        "singapore": ["sg", "singapore"],
-        "sg": ["sg", "singapore"],
-        "japan": ["jp", "japan"],
-        "jp": ["jp", "japan"],
-        "korea": ["kr", "korea"],
-        "kr": ["kr", "korea"],
-        "germany": ["de", "germany"],
-        "de": ["de", "germany"],
-        "france": ["fr", "france"],
-        "fr": ["fr", "france"],
-        "australia": ["au", "australia"],
-        "au": ["au", "australia"],
-        "canada": ["ca", "canada"],
-        "ca": ["ca", "canada"],
-        "switzerland": ["ch", "switzerland", "swiss"],
-        "ch": ["ch", "switzerland", "swiss"],
-    }
-    
     # 获取搜索关键词列表
-    search_terms = aliases.get(c, [c])
+    search_terms = COUNTRY_ALIASES.get(c, [c])
     
-    def match_country(val):
-        if pd.isna(val):
-            return False
-        val_lower = str(val).lower().strip()
-        for term in search_terms:
-            # 精确匹配（代码如 US, CN）或者值包含搜索词
-            if val_lower == term or term in val_lower:
-                # 排除误匹配：如果搜索 "us"/"united states"，不应匹配 "australia"
-                if term in ["us", "united states"]:
-                    if "australia" in val_lower:
-                        continue
-                return True
-        return False
+    # 只在不重复的国家名称上做向量化字符串匹配，再按名称筛选整表
+    names = pd.Series(df["Country"].dropna().unique())
+    names_lower = names.astype(str).str.lower().str.strip()
+    # 所有搜索词编译成一个正则交替式，每组只扫描一次
+    us_terms = [t for t in search_terms if t in US_TERMS]
+    other_terms = [t for t in search_terms if t not in US_TERMS]
+    matched = pd.Series(False, index=names.index)
+    if other_terms:
+        matched |= names_lower.str.contains(_alternation(other_terms), regex=True)
+    if us_terms:
+        # 排除误匹配：如果搜索 "us"/"united states"，不应匹配 "australia"
+        hit = names_lower.str.contains(_alternation(us_terms), regex=True)
+        matched |= hit & ~names_lower.str.contains("australia", regex=False)
     
-    mask = df["Country"].apply(match_country)
-    return df[mask].copy()
+    return df[df["Country"].isin(names[matched])]
 
 
 def get_top_n(df: pd.DataFrame, n: int) -> pd.DataFrame:
     """获取排名前 N 的高校（按 Rank 排序，忽略无排名的）"""
-    df_valid = df[df["Rank"].notna()].copy()
-    df_valid = df_valid.sort_values("Rank")
-    return df_valid.head(n)
+    return top_n_by(df, "Rank", n)
 
 
 def display_results(df: pd.DataFrame, year: int, country: Optional[str], n: int):
@@ -120,48 +178,30 @@ def display_results(df: pd.DataFrame, year: int, country: Optional[str], n: int)
     print(f"\n📊 {year} 年 QS 世界大学排名{location_str} Top {len(df)}\n")
     print("=" * 100)
 
-    # Determine columns to show
-    indicator_cols = [
-        (["Overall_Score", "Overall"], "Overall"),
-        (["Academic Reputation"], "学术声誉"),
-        (["Employer Reputation"], "雇主声誉"),
-        (["Citations per Faculty"], "论文引用"),
-        (["Sustainability"], "可持续"),
-    ]
-
-    # Resolve actual column names
-    resolved_cols = []
-    for candidates, label in indicator_cols:
-        for c in candidates:
-            if c in df.columns:
-                resolved_cols.append((c, label))
-                break
+    # Columns to show (resolved once in load_data)
+    resolved_cols = df.attrs["indicator_cols"]
 
     # Print header
-    print(f"{'排名':^6} {'大学名称':<45} {'国家':^8}", end="")
-    for _, label in resolved_cols:
-        print(f" {label:^8}", end="")
-    print()
+    header = f"{'排名':^6} {'大学名称':<45} {'国家':^8}"
+    print(header + "".join(f" {label:^8}" for _, label in resolved_cols))
     print("-" * 100)
 
     # Print rows
-    for _, row in df.iterrows():
-        rank = row["Rank"]
+    ranks = df["Rank"].to_numpy()
+    unis = df["University"].to_numpy()
+    countries = df["Country"].to_numpy()
+    score_arrays = [df[col].to_numpy() for col, _ in resolved_cols]
+    lines = []
+    for rank, uni, country, *scores in zip(ranks, unis, countries, *score_arrays):
         if pd.notna(rank) and rank == int(rank):
             rank = int(rank)
-        uni = row["University"]
         if len(uni) > 42:
             uni = uni[:40] + "..."
-        country_code = row["Country"] if pd.notna(row["Country"]) else "-"
-
-        print(f"{str(rank):^6} {uni:<45} {country_code:^8}", end="")
-        for col, _ in resolved_cols:
-            val = row[col]
-            if pd.notna(val):
-                print(f" {val:^8.1f}", end="")
-            else:
-                print(f" {'-':^8}", end="")
-        print()
+        country_code = country if pd.notna(country) else "-"
+
+        score_str = "".join(f" {val:^8.1f}" if pd.notna(val) else f" {'-':^8}" for val in scores)
+        lines.append(f"{str(rank):^6} {uni:<45} {country_code:^8}{score_str}")
+    print_lines(lines)
 
     print("=" * 100)
     print(f"共 {len(df)} 所高校")
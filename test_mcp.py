@@ -8,340 +8,383 @@ QS 世界大学排名 MCP 服务器测试脚本
 2. 错误响应格式
 3. 统一国家信息结构 (iso_code + name)
 4. 一致的数据结构
+
+用法:
+    python test_mcp.py          # 运行一次全部测试
+    python test_mcp.py -r 5     # 在同一个事件循环中重复运行 5 次
 """
 
+import argparse
 import asyncio
+import functools
+import hashlib
 import json
+import sys
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import fastmcp
+from fastmcp import Client
+
+# 导入 MCP 服务器模块，测试通过内存中的客户端会话调用其中的工具
+try:
+    import mcp_server
+except ImportError as e:
+    raise SystemExit(f"❌ 无法导入 mcp_server: {e}（请在项目根目录运行并安装 requirements.txt 中的依赖）")
+
+# orjson 为可选依赖：安装后用于解析工具返回的 JSON，否则回退到标准库 json
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+# 响应超过该长度时在线程中解析，避免大结果阻塞事件循环；小结果直接解析，省去线程切换
+PARSE_IN_THREAD_SIZE = 64 * 1024
+
+# 单个测试的超时时间（秒）
+TEST_TIMEOUT = 30
+
+# 输出中的分隔线
+SEP = "=" * 60
+SUB = "-" * 40
+
+# Top 100 分布柱状图：每 2 所大学一个方块，最多 50 个，预先生成各长度的柱子
+BARS = tuple("█" * i for i in range(51))
+
+# 工具目录缓存：以服务器源码的哈希为键，源码不变时跳过 list_tools() 发现
+TOOLS_CACHE_FILE = Path(__file__).with_name(".mcp_tools_cache.json")
+
+
+def _read_tools_cache(key: str) -> Optional[Dict[str, Any]]:
+    """读取工具目录缓存，文件不存在、损坏或键不匹配时返回 None"""
+    try:
+        cache = _loads(TOOLS_CACHE_FILE.read_bytes())
+    except (OSError, ValueError):
+        return None
+    return cache.get("tools") if cache.get("key") == key else None
+
+
+def _write_tools_cache(key: str, tools: Dict[str, Any]):
+    """写入工具目录缓存（目录不可写等情况下忽略失败）"""
+    try:
+        TOOLS_CACHE_FILE.write_text(json.dumps({"key": key, "tools": tools}, ensure_ascii=False), encoding="utf-8")
+    except OSError:
+        pass
+
+
+def _path(*keys: str, default: Any = None) -> Callable[[Dict[str, Any]], Any]:
+    """预先构造嵌套字段的取值函数，任一层级缺失时返回 default"""
+    def get(data: Dict[str, Any]) -> Any:
+        for key in keys:
+            if not isinstance(data, dict) or key not in data:
+                return default
+            data = data[key]
+        return data
+    return get
+
+
+# 展示时用到的嵌套字段，取值函数只构造一次
+OVERALL_SCORE = _path('scores', 'overall_score', 'value', default='N/A')
+VALID_OPTIONS = _path('details', 'valid_options')
+
+
+@functools.lru_cache(maxsize=512)
+def _format_country_pair(iso: Optional[str], name: Any) -> str:
+    """按 (iso_code, name) 缓存格式化结果，同一国家在各测试中只格式化一次"""
+    return f"{iso or '??'}: {name}"
 
 
 def format_country(country_info):
     """格式化国家信息显示"""
     if isinstance(country_info, dict):
-        iso = country_info.get('iso_code', '??')
-        name = country_info.get('name', 'Unknown')
-        return f"{iso or '??'}: {name}"
+        return _format_country_pair(country_info.get('iso_code'), country_info.get('name', 'Unknown'))
     return str(country_info)
 
 
-async def test_mcp_tools():
-    """测试 MCP 工具函数"""
-    # 导入 MCP 服务器模块
-    from mcp_server import (
-        search_university,
-        get_top_universities,
-        get_country_stats,
-        get_country_scores,
-        get_rank_changes,
-        get_top100_distribution,
-        get_summary,
-        list_available_years,
-        list_countries
-    )
-    
-    print("=" * 60)
-    print("🧪 开始测试 QS 世界大学排名 MCP 服务器 (改进版)")
-    print("=" * 60)
-    
-    # 测试 1: 查看可用年份
-    print("\n📅 测试 1: 查看可用年份")
-    print("-" * 40)
-    try:
-        result = await list_available_years()
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            years_data = data.get('data', {})
-            print(f"可用年份: {years_data.get('available_years', [])}")
-            print(f"最新年份: {years_data.get('latest_year')}")
-            print(f"最早年份: {years_data.get('earliest_year')}")
-            for stat in years_data.get('year_statistics', []):
-                print(f"  {stat['year']}年: {stat['total_universities']}所大学, {stat['ranked_universities']}所有排名")
-            print("✅ 查看可用年份测试通过")
-        else:
-            print(f"❌ 返回状态异常: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 查看可用年份测试失败: {e}")
-    
-    # 测试 2: 大学搜索
-    print("\n🏫 测试 2: 大学搜索")
-    print("-" * 40)
-    try:
-        result = await search_university(keyword="MIT", year=2026)
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            search_data = data.get('data', {})
-            query = search_data.get('query', {})
-            summary = search_data.get('summary', {})
-            print(f"关键词: {query.get('keyword')}")
-            print(f"找到大学数: {summary.get('total_universities')}")
-            for uni in search_data.get('universities', [])[:3]:
-                print(f"  🎓 {uni.get('name')}")
-                print(f"     国家: {format_country(uni.get('country'))}")
-                for year_info in uni.get('years_data', []):
-                    print(f"     {year_info.get('year')}年排名: {year_info.get('rank')}")
-            print("✅ 大学搜索测试通过")
-        else:
-            print(f"❌ 返回状态异常: {data}")
-    except Exception as e:
-        print(f"❌ 大学搜索测试失败: {e}")
-    
-    # 测试 2b: 大学搜索 - 错误参数验证
-    print("\n🔴 测试 2b: 大学搜索 - 无效参数")
-    print("-" * 40)
-    try:
-        result = await search_university(keyword="X", year=2026)  # 关键词太短
-        data = json.loads(result)
-        if data.get('status') == 'error':
-            err = data.get('data', {})
-            print(f"错误类型: {err.get('error_type')}")
-            print(f"错误信息: {err.get('message')}")
-            print("✅ 参数验证测试通过")
-        else:
-            print(f"⚠️ 应该返回错误，但返回了: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 参数验证测试失败: {e}")
-    
-    # 测试 3: 排名查询（全球）
-    print("\n🌍 测试 3: 全球排名查询")
-    print("-" * 40)
-    try:
-        result = await get_top_universities(year=2026, top_n=10)
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            top_data = data.get('data', {})
-            query = top_data.get('query', {})
-            summary = top_data.get('summary', {})
-            print(f"年份: {query.get('year')}")
-            print(f"返回数量: {summary.get('returned_count')}")
-            print(f"Top 10 大学:")
-            for uni in top_data.get('universities', []):
-                country = format_country(uni.get('country'))
-                print(f"  {uni.get('rank'):>3}. {uni.get('name')[:40]:<40} ({country})")
-            print("✅ 全球排名查询测试通过")
-        else:
-            print(f"❌ 返回状态异常: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 全球排名查询测试失败: {e}")
-    
-    # 测试 4: 排名查询（中国）
-    print("\n🇨🇳 测试 4: 中国大学排名查询 (使用 ISO 代码 CN)")
-    print("-" * 40)
-    try:
-        result = await get_top_universities(year=2026, country="CN", top_n=10)
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            top_data = data.get('data', {})
-            query = top_data.get('query', {})
-            summary = top_data.get('summary', {})
-            print(f"年份: {query.get('year')}")
-            print(f"筛选国家: {format_country(query.get('country_filter'))}")
-            print(f"返回数量: {summary.get('returned_count')}")
-            for uni in top_data.get('universities', []):
-                overall = uni.get('scores', {}).get('overall_score', {}).get('value', 'N/A')
-                print(f"  {uni.get('rank'):>3}. {uni.get('name')[:35]:<35} 分数: {overall}")
-            print("✅ 中国大学排名查询测试通过")
-        else:
-            print(f"❌ 返回状态异常: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 中国大学排名查询测试失败: {e}")
-    
-    # 测试 5: 国家统计
-    print("\n📊 测试 5: 国家统计")
-    print("-" * 40)
-    try:
-        result = await get_country_stats(year=2026, top_n=10)
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            stats_data = data.get('data', {})
-            query = stats_data.get('query', {})
-            summary = stats_data.get('summary', {})
-            print(f"年份: {query.get('year')}")
-            print(f"总大学数: {summary.get('total_universities')}")
-            print(f"有排名大学: {summary.get('total_ranked')}")
-            print(f"国家总数: {summary.get('total_countries')}")
-            print("Top 10 国家:")
-            for item in stats_data.get('countries', []):
-                country = format_country(item.get('country'))
-                stats = item.get('statistics', {})
-                print(f"  {item.get('rank'):>2}. {country:<25} {stats.get('total'):>4} 所 ({stats.get('percentage_of_total')}%)")
-            print("✅ 国家统计测试通过")
-        else:
-            print(f"❌ 返回状态异常: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 国家统计测试失败: {e}")
-    
-    # 测试 6: 国家平均分对比
-    print("\n📈 测试 6: 国家平均分对比")
-    print("-" * 40)
-    try:
-        result = await get_country_scores(year=2026, top_n=10)
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            score_data = data.get('data', {})
-            query = score_data.get('query', {})
-            summary = score_data.get('summary', {})
-            print(f"年份: {query.get('year')}")
-            print(f"使用分数列: {summary.get('score_column_used')}")
-            print("Top 10 国家（按平均分）:")
-            for item in score_data.get('countries', []):
-                country = format_country(item.get('country'))
-                scores = item.get('scores', {})
-                stats = item.get('statistics', {})
-                print(f"  {item.get('rank'):>2}. {country:<22} "
-                      f"平均: {scores.get('average'):>5.1f}  "
-                      f"最高: {scores.get('maximum'):>5.1f}  "
-                      f"大学数: {stats.get('university_count')}")
-            print("✅ 国家平均分对比测试通过")
-        else:
-            print(f"❌ 返回状态异常: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 国家平均分对比测试失败: {e}")
-    
-    # 测试 7: 排名变化
-    print("\n📉 测试 7: 排名变化（上升）")
-    print("-" * 40)
-    try:
-        result = await get_rank_changes(year=2026, top_n=10, direction="rise")
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            change_data = data.get('data', {})
-            query = change_data.get('query', {})
-            summary = change_data.get('summary', {})
-            print(f"对比年份: {query.get('compare_year')} → {query.get('year')}")
-            print(f"变化方向: {query.get('direction')} ({query.get('direction_description')})")
-            print(f"找到 {summary.get('total_found')} 所大学:")
-            for uni in change_data.get('universities', [])[:10]:
-                ranking = uni.get('ranking', {})
-                print(f"  {uni.get('name')[:35]:<35} "
-                      f"{ranking.get('previous_rank')} → {ranking.get('current_rank')} "
-                      f"({ranking.get('change_display')})")
-            print("✅ 排名变化测试通过")
-        else:
-            print(f"❌ 返回状态异常: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 排名变化测试失败: {e}")
+class MCPHost:
+    """持有单个 MCP 客户端会话：所有测试共用一次连接和一次工具发现"""
 
-    # 测试 7b: 排名变化 - 无效参数
-    print("\n🔴 测试 7b: 排名变化 - 无效 direction")
-    print("-" * 40)
-    try:
-        result = await get_rank_changes(year=2026, top_n=10, direction="invalid")
-        data = json.loads(result)
-        if data.get('status') == 'error':
-            err = data.get('data', {})
-            print(f"错误类型: {err.get('error_type')}")
-            print(f"错误信息: {err.get('message')}")
-            print(f"有效选项: {err.get('details', {}).get('valid_options')}")
-            print("✅ 参数验证测试通过")
-        else:
-            print(f"⚠️ 应该返回错误，但返回了: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 参数验证测试失败: {e}")
-    
-    # 测试 8: Top 100 分布
-    print("\n🏆 测试 8: Top 100 分布")
-    print("-" * 40)
-    try:
-        result = await get_top100_distribution(year=2026)
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            dist_data = data.get('data', {})
-            query = dist_data.get('query', {})
-            summary = dist_data.get('summary', {})
-            print(f"年份: {query.get('year')}")
-            print(f"涉及国家数: {summary.get('total_countries')}")
-            print("分布情况:")
-            for item in dist_data.get('distribution', [])[:10]:
-                country = format_country(item.get('country'))
-                stats = item.get('statistics', {})
-                bar_len = int(stats.get('count', 0) / 2)
-                bar = "█" * bar_len
-                print(f"  {country:<25} {bar} {stats.get('count')} ({stats.get('percentage')}%)")
-            print("✅ Top 100 分布测试通过")
-        else:
-            print(f"❌ 返回状态异常: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ Top 100 分布测试失败: {e}")
-    
-    # 测试 9: 综合统计
-    print("\n📋 测试 9: 综合统计")
-    print("-" * 40)
-    try:
-        result = await get_summary(year=2026)
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            summary_data = data.get('data', {})
-            basic = summary_data.get('basic_info', {})
-            print(f"年份: {summary_data.get('query', {}).get('year')}")
-            print(f"参评大学: {basic.get('total_universities')}")
-            print(f"获得排名: {basic.get('ranked_universities')}")
-            print(f"覆盖国家: {basic.get('countries_covered')}")
-            print("\nTop 10 大学:")
-            for uni in summary_data.get('top_10', []):
-                country = format_country(uni.get('country'))
-                print(f"  {uni.get('rank'):>2}. {uni.get('name')[:40]} ({country})")
-            score_stats = summary_data.get('score_stats')
-            if score_stats:
-                print(f"\n分数统计:")
-                print(f"  平均分: {score_stats.get('average')}")
-                print(f"  中位数: {score_stats.get('median')}")
-                print(f"  最高分: {score_stats.get('maximum')}")
-            comparison = summary_data.get('comparison_with_prev_year')
-            if comparison:
-                print(f"\n与上年对比: {comparison.get('description')}")
-            print("✅ 综合统计测试通过")
-        else:
-            print(f"❌ 返回状态异常: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 综合统计测试失败: {e}")
+    def __init__(self, server, source_file: str):
+        self._server = server
+        self._source_file = source_file
+        self._stack = AsyncExitStack()
+        self.session: Optional[Client] = None
+        self.tools: Dict[str, Any] = {}  # 工具名 -> 输入参数 schema
+
+    async def __aenter__(self) -> "MCPHost":
+        self.session = await self._stack.enter_async_context(Client(self._server))
+        self.tools = await self._discover_tools()
+        return self
+
+    async def _discover_tools(self) -> Dict[str, Any]:
+        """获取工具目录：服务器源码和 fastmcp 版本都未变化时直接使用磁盘缓存
+
+        工具的输入 schema 由 fastmcp 根据函数签名生成，升级 fastmcp 后需要重新获取。
+        """
+        source = await asyncio.to_thread(Path(self._source_file).read_bytes)
+        digest = hashlib.sha256(source)
+        digest.update(fastmcp.__version__.encode())
+        key = digest.hexdigest()
+        tools = await asyncio.to_thread(_read_tools_cache, key)
+        if tools is None:
+            tools = {tool.name: tool.inputSchema for tool in await self.session.list_tools()}
+            await asyncio.to_thread(_write_tools_cache, key, tools)
+        return tools
+
+    async def __aexit__(self, *exc_info):
+        await self._stack.aclose()
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None) -> str:
+        """调用工具并返回文本结果；工具不存在时直接报错，不再请求服务器"""
+        if name not in self.tools:
+            raise ValueError(f"服务器未提供工具 {name}（可用工具: {', '.join(self.tools)}）")
+        result = await self.session.call_tool(name, arguments or {})
+        return result.content[0].text
+
+
+def _render_available_years(years_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 1: 查看可用年份"""
+    yield f"可用年份: {years_data.get('available_years', [])}"
+    yield f"最新年份: {years_data.get('latest_year')}"
+    yield f"最早年份: {years_data.get('earliest_year')}"
+    for stat in years_data.get('year_statistics', []):
+        yield f"  {stat['year']}年: {stat['total_universities']}所大学, {stat['ranked_universities']}所有排名"
+
+
+def _render_search(search_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 2: 大学搜索"""
+    query = search_data.get('query', {})
+    summary = search_data.get('summary', {})
+    yield f"关键词: {query.get('keyword')}"
+    yield f"找到大学数: {summary.get('total_universities')}"
+    for uni in search_data.get('universities', [])[:3]:
+        yield f"  🎓 {uni.get('name')}"
+        yield f"     国家: {format_country(uni.get('country'))}"
+        for year_info in uni.get('years_data', []):
+            yield f"     {year_info.get('year')}年排名: {year_info.get('rank')}"
+
+
+def _render_search_invalid(err: Dict[str, Any]) -> Iterator[str]:
+    """测试 2b: 大学搜索 - 错误参数验证"""
+    yield f"错误类型: {err.get('error_type')}"
+    yield f"错误信息: {err.get('message')}"
+
+
+def _render_top_global(top_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 3: 排名查询（全球）"""
+    query = top_data.get('query', {})
+    summary = top_data.get('summary', {})
+    yield f"年份: {query.get('year')}"
+    yield f"返回数量: {summary.get('returned_count')}"
+    yield f"Top 10 大学:"
+    for uni in top_data.get('universities', []):
+        country = format_country(uni.get('country'))
+        yield f"  {uni.get('rank'):>3}. {uni.get('name') or '':<40.40} ({country})"
+
+
+def _render_top_china(top_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 4: 排名查询（中国）"""
+    query = top_data.get('query', {})
+    summary = top_data.get('summary', {})
+    yield f"年份: {query.get('year')}"
+    yield f"筛选国家: {format_country(query.get('country_filter'))}"
+    yield f"返回数量: {summary.get('returned_count')}"
+    for uni in top_data.get('universities', []):
+        overall = OVERALL_SCORE(uni)
+        yield f"  {uni.get('rank'):>3}. {uni.get('name') or '':<35.35} 分数: {overall}"
+
+
+def _render_country_stats(stats_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 5: 国家统计"""
+    query = stats_data.get('query', {})
+    summary = stats_data.get('summary', {})
+    yield f"年份: {query.get('year')}"
+    yield f"总大学数: {summary.get('total_universities')}"
+    yield f"有排名大学: {summary.get('total_ranked')}"
+    yield f"国家总数: {summary.get('total_countries')}"
+    yield "Top 10 国家:"
+    for item in stats_data.get('countries', []):
+        country = format_country(item.get('country'))
+        stats = item.get('statistics', {})
+        yield f"  {item.get('rank'):>2}. {country:<25} {stats.get('total'):>4} 所 ({stats.get('percentage_of_total')}%)"
 
-    # 测试 9b: 综合统计 - 无效年份
-    print("\n🔴 测试 9b: 综合统计 - 无效年份")
-    print("-" * 40)
+
+def _render_country_scores(score_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 6: 国家平均分对比"""
+    query = score_data.get('query', {})
+    summary = score_data.get('summary', {})
+    yield f"年份: {query.get('year')}"
+    yield f"使用分数列: {summary.get('score_column_used')}"
+    yield "Top 10 国家（按平均分）:"
+    for item in score_data.get('countries', []):
+        country = format_country(item.get('country'))
+        scores = item.get('scores', {})
+        stats = item.get('statistics', {})
+        yield (f"  {item.get('rank'):>2}. {country:<22} "
+               f"平均: {scores.get('average'):>5.1f}  "
+               f"最高: {scores.get('maximum'):>5.1f}  "
+               f"大学数: {stats.get('university_count')}")
+
+
+def _render_country_scores_count(score_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 6b: 国家平均分对比 - 国家数（只统计当年实际有分数的国家/地区）"""
+    total = score_data.get('summary', {}).get('total_countries_with_scores')
+    countries = score_data.get('countries', [])
+    empty = [c.get('country', {}).get('name') for c in countries
+             if not c.get('statistics', {}).get('university_count')]
+    yield f"年份: {score_data.get('query', {}).get('year')}"
+    yield f"有分数的国家数: {total}，返回国家数: {len(countries)}"
+    if total != len(countries) or empty:
+        raise AssertionError(f"国家数不一致或包含没有数据的国家: {empty[:5]}")
+
+
+def _render_rank_changes(change_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 7: 排名变化"""
+    query = change_data.get('query', {})
+    summary = change_data.get('summary', {})
+    yield f"对比年份: {query.get('compare_year')} → {query.get('year')}"
+    yield f"变化方向: {query.get('direction')} ({query.get('direction_description')})"
+    yield f"找到 {summary.get('total_found')} 所大学:"
+    for uni in change_data.get('universities', [])[:10]:
+        ranking = uni.get('ranking', {})
+        yield (f"  {uni.get('name') or '':<35.35} "
+               f"{ranking.get('previous_rank')} → {ranking.get('current_rank')} "
+               f"({ranking.get('change_display')})")
+
+
+def _render_rank_changes_invalid(err: Dict[str, Any]) -> Iterator[str]:
+    """测试 7b: 排名变化 - 无效参数"""
+    yield f"错误类型: {err.get('error_type')}"
+    yield f"错误信息: {err.get('message')}"
+    yield f"有效选项: {VALID_OPTIONS(err)}"
+
+
+def _render_top100_distribution(dist_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 8: Top 100 分布"""
+    query = dist_data.get('query', {})
+    summary = dist_data.get('summary', {})
+    yield f"年份: {query.get('year')}"
+    yield f"涉及国家数: {summary.get('total_countries')}"
+    yield "分布情况:"
+    for item in dist_data.get('distribution', [])[:10]:
+        country = format_country(item.get('country'))
+        stats = item.get('statistics', {})
+        bar = BARS[min(int(stats.get('count', 0) / 2), len(BARS) - 1)]
+        yield f"  {country:<25} {bar} {stats.get('count')} ({stats.get('percentage')}%)"
+
+
+def _render_list_countries(countries_data: Dict[str, Any]) -> Iterator[str]:
+    """测试 9: 查看国家列表"""
+    query = countries_data.get('query', {})
+    summary = countries_data.get('summary', {})
+    yield f"年份筛选: {query.get('year_filter')}"
+    yield f"国家总数: {summary.get('count')}"
+    yield "部分国家（带 ISO 代码的）:"
+    countries = countries_data.get('countries', [])
+    with_iso = [c for c in countries if c.get('iso_code')][:10]
+    for c in with_iso:
+        yield f"  [{c.get('iso_code')}] {c.get('name')}"
+
+
+async def _parse(text: str) -> Dict[str, Any]:
+    """解析工具返回的 JSON；大结果放到线程中解析，不阻塞其他并发测试"""
+    if len(text) > PARSE_IN_THREAD_SIZE:
+        return await asyncio.to_thread(_loads, text)
+    return _loads(text)
+
+
+class ToolCase(NamedTuple):
+    """一个工具测试：调用参数、期望状态以及结果的展示方式"""
+    emoji: str
+    name: str
+    label: str  # 通过/失败提示中使用的测试名
+    tool: str
+    arguments: Dict[str, Any]
+    render: Callable[[Dict[str, Any]], Iterator[str]]  # 接收响应中的 data 字段，逐行生成输出
+    expect: str = "success"
+
+
+async def run_test(host: MCPHost, case: ToolCase) -> Tuple[str, bool, List[str]]:
+    """执行单个测试：调用工具、检查状态并生成输出；所有测试共用这一流程"""
+    out = [f"\n{case.emoji} {case.name}", SUB]
+    ok = False
     try:
-        result = await get_summary(year=1999)
-        data = json.loads(result)
-        if data.get('status') == 'error':
-            err = data.get('data', {})
-            print(f"错误类型: {err.get('error_type')}")
-            print(f"错误信息: {err.get('message')}")
-            print(f"可用年份: {err.get('details', {}).get('available_years')}")
-            print("✅ 年份验证测试通过")
+        data = await _parse(await host.call_tool(case.tool, case.arguments))
+        status = data.get('status')
+        if status == case.expect:
+            out.extend(case.render(data.get('data', {})))
+            out.append(f"✅ {case.label}测试通过")
+            ok = True
+        elif case.expect == "error":
+            out.append(f"⚠️ 应该返回错误，但返回了: {status}")
         else:
-            print(f"⚠️ 应该返回错误，但返回了: {data.get('status')}")
+            out.append(f"❌ 返回状态异常: {status}")
     except Exception as e:
-        print(f"❌ 年份验证测试失败: {e}")
+        out.append(f"❌ {case.label}测试失败: {e}")
+    return case.name, ok, out
+
+
+# 全部测试，按输出顺序排列
+TESTS = [
+    ToolCase("📅", "测试 1: 查看可用年份", "查看可用年份", "list_available_years", {}, _render_available_years),
+    ToolCase("🏫", "测试 2: 大学搜索", "大学搜索", "search_university", {"keyword": "MIT", "year": 2026}, _render_search),
+    ToolCase("🔴", "测试 2b: 大学搜索 - 无效参数", "参数验证", "search_university", {"keyword": "X", "year": 2026}, _render_search_invalid, expect="error"),  # 关键词太短
+    ToolCase("🌍", "测试 3: 全球排名查询", "全球排名查询", "get_top_universities", {"year": 2026, "top_n": 10}, _render_top_global),
+    ToolCase("🇨🇳", "测试 4: 中国大学排名查询 (使用 ISO 代码 CN)", "中国大学排名查询", "get_top_universities", {"year": 2026, "country": "CN", "top_n": 10}, _render_top_china),
+    ToolCase("📊", "测试 5: 国家统计", "国家统计", "get_country_stats", {"year": 2026, "top_n": 10}, _render_country_stats),
+    ToolCase("📈", "测试 6: 国家平均分对比", "国家平均分对比", "get_country_scores", {"year": 2026, "top_n": 10}, _render_country_scores),
+    ToolCase("🔢", "测试 6b: 国家平均分对比 - 国家数", "国家数统计", "get_country_scores", {"year": 2024, "top_n": 500}, _render_country_scores_count),
+    ToolCase("📉", "测试 7: 排名变化（上升）", "排名变化", "get_rank_changes", {"year": 2026, "top_n": 10, "direction": "rise"}, _render_rank_changes),
+    ToolCase("🔴", "测试 7b: 排名变化 - 无效 direction", "参数验证", "get_rank_changes", {"year": 2026, "top_n": 10, "direction": "invalid"}, _render_rank_changes_invalid, expect="error"),
+    ToolCase("🏆", "测试 8: Top 100 分布", "Top 100 分布", "get_top100_distribution", {"year": 2026}, _render_top100_distribution),
+    ToolCase("🌐", "测试 9: 查看国家列表", "查看国家列表", "list_countries", {"year": 2026}, _render_list_countries),
+]
+
+
+async def test_mcp_tools():
+    """测试 MCP 工具函数"""
+    print(f"{SEP}\n🧪 开始测试 QS 世界大学排名 MCP 服务器 (改进版)\n{SEP}")
     
-    # 测试 10: 查看国家列表
-    print("\n🌐 测试 10: 查看国家列表")
-    print("-" * 40)
-    try:
-        result = await list_countries(year=2026)
-        data = json.loads(result)
-        if data.get('status') == 'success':
-            countries_data = data.get('data', {})
-            query = countries_data.get('query', {})
-            summary = countries_data.get('summary', {})
-            print(f"年份筛选: {query.get('year_filter')}")
-            print(f"国家总数: {summary.get('count')}")
-            print("部分国家（带 ISO 代码的）:")
-            countries = countries_data.get('countries', [])
-            with_iso = [c for c in countries if c.get('iso_code')][:10]
-            for c in with_iso:
-                print(f"  [{c.get('iso_code')}] {c.get('name')}")
-            print("✅ 查看国家列表测试通过")
+    # 各测试互不依赖，共用同一个会话并发执行；单个测试失败或超时不影响其他测试
+    # 输出先缓存在各自的列表中，完成后按原顺序打印
+    async with MCPHost(mcp_server.mcp, mcp_server.__file__) as host:
+        results = await asyncio.gather(
+            *(asyncio.wait_for(run_test(host, case), TEST_TIMEOUT) for case in TESTS),
+            return_exceptions=True,
+        )
+    passed, failed = [], []
+    for case, result in zip(TESTS, results):
+        if isinstance(result, BaseException):
+            name, ok, out = case.name, False, [f"\n❌ {case.name} 异常退出: {result!r}"]
         else:
-            print(f"❌ 返回状态异常: {data.get('status')}")
-    except Exception as e:
-        print(f"❌ 查看国家列表测试失败: {e}")
+            name, ok, out = result
+        (passed if ok else failed).append(name)
+        # 每个测试的输出合并为一次写入
+        sys.stdout.write("\n".join(out) + "\n")
     
-    print("\n" + "=" * 60)
-    print("🎉 所有测试完成！")
-    print("=" * 60)
+    summary = [f"\n{SEP}", "🎉 所有测试完成！", f"通过 {len(passed)} / {len(TESTS)}"]
+    summary.extend(f"  ❌ {name}" for name in failed)
+    summary.append(SEP)
+    sys.stdout.write("\n".join(summary) + "\n")
 
 
 def main():
     """主函数"""
-    asyncio.run(test_mcp_tools())
+    parser = argparse.ArgumentParser(description="QS 世界大学排名 MCP 服务器测试")
+    parser.add_argument("-r", "--repeat", type=int, default=1, help="重复运行次数，用于测量耗时 (默认 1)")
+    args = parser.parse_args()
+    
+    # 多次运行共用同一个事件循环，避免每次重新创建和销毁
+    loop = asyncio.new_event_loop()
+    try:
+        for _ in range(max(args.repeat, 1)):
+            loop.run_until_complete(test_mcp_tools())
+    finally:
+        loop.run_until_complete(loop.shutdown_asyncgens())
+        loop.run_until_complete(loop.shutdown_default_executor())
+        loop.close()
 
 
 if __name__ == "__main__":